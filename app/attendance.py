@@ -1,6 +1,7 @@
-import cv2
 import sys
 import os
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 from datetime import datetime
 
 # 1. Setup Root Path to find 'src'
@@ -11,26 +12,42 @@ sys.path.append(root_dir)
 # 2. Import your modules
 from src.recognizer.face_recognition_system import FaceRecognitionSystem
 from src.logger.csv_logger import CSVLogger
-from app.database import record_attendance
-import sqlite3 # Needed to fetch role
+from src.capture import open_capture
+from src.utils.tracing import StageTracer
+from app.database import record_attendance, set_attendance_photo, get_student_class
+from app.snapshots import SnapshotWriter
 
 class AttendanceManager:
     """
     Bridge between UI, Database, and CSV Logging.
     """
 
-    def __init__(self):
+    BURST_FRAMES = 5        # Frames a mark may look at before deciding
+    MIN_CONFIDENCE = 50     # Percent needed for a match
+
+    def __init__(self, camera_source=0):
+        # --- CAMERA ---
+        # Device index, video file or stream URL (e.g. "rtsp://door-2/stream")
+        self.camera_source = camera_source
+
         # --- PATHS ---
-        self.encodings_path = os.path.join(root_dir, "models", "encodings.pkl")
+        self.encodings_path = os.path.join(root_dir, "models", "encodings.bin")
         self.predictor_path = os.path.join(root_dir, "models", "shape_predictor_68_face_landmarks.dat")
         self.csv_folder = os.path.join(root_dir, "attendance_records")
-        self.db_path = os.path.join(root_dir, "database", "attendance.db") # For role lookup
+
+        # --- DETECTOR (ATTENDANCE_DETECTOR=hog|haar|hybrid, per deployment) ---
+        self.detector = os.environ.get("ATTENDANCE_DETECTOR", "hog")
+
+        # --- TRACING (ATTENDANCE_TRACE=1 enables per-stage timings) ---
+        self.tracer = StageTracer(enabled=os.environ.get("ATTENDANCE_TRACE") == "1")
 
         # --- LOAD ENGINE ---
         try:
             self.recognizer = FaceRecognitionSystem(
                 model_path=self.encodings_path, 
-                predictor_path=self.predictor_path
+                predictor_path=self.predictor_path,
+                tracer=self.tracer,
+                detector=self.detector
             )
             print("✅ Face Recognition Engine Loaded")
         except Exception as e:
@@ -46,13 +63,43 @@ class AttendanceManager:
             print(f"❌ CSV Logger failed: {e}")
             self.csv_logger = None
 
+        # --- SNAPSHOTS (face thumbnails written in the background) ---
+        # ATTENDANCE_SNAPSHOT_FORMAT=jpg|webp|png, ATTENDANCE_SNAPSHOT_QUALITY=0-100,
+        # ATTENDANCE_SNAPSHOT_FULL=1 keeps the whole frame instead of the face crop
+        self.snapshots = SnapshotWriter(
+            os.path.join(root_dir, "attendance_photos"),
+            fmt=os.environ.get("ATTENDANCE_SNAPSHOT_FORMAT", "jpg"),
+            quality=int(os.environ.get("ATTENDANCE_SNAPSHOT_QUALITY", "85")),
+            full_frame=os.environ.get("ATTENDANCE_SNAPSHOT_FULL") == "1"
+        )
+
+        # --- BURST VERIFICATION (ATTENDANCE_BURST=K frames per mark) ---
+        self.burst_frames = max(1, int(os.environ.get("ATTENDANCE_BURST", self.BURST_FRAMES)))
+        # One worker: frames must reach the stream's liveness state in order
+        self._burst_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="burst")
+        self.last_decision = None
+
         self.cap = None
 
     def start_camera(self):
         if self.cap is None or not self.cap.isOpened():
-            self.cap = cv2.VideoCapture(0, cv2.CAP_DSHOW)
-            if not self.cap.isOpened():
-                self.cap = cv2.VideoCapture(0)
+            self.cap = open_capture(self.camera_source)
+
+    def export_trace(self, path=None):
+        """Dumps collected timings as Chrome trace JSON (when tracing is enabled)."""
+        if not self.tracer.enabled:
+            return None
+        path = path or os.path.join(root_dir, "traces", f"{datetime.now().strftime('%Y%m%d_%H%M%S')}_trace.json")
+        self.tracer.export_chrome_trace(path)
+        return path
+
+    def shutdown(self):
+        """Finishes queued snapshots (and their DB photo paths) and buffered CSV rows before the app exits."""
+        self.stop_camera()
+        self.snapshots.close(wait=True)
+        if self.csv_logger:
+            self.csv_logger.close()
+        self._burst_pool.shutdown(wait=False, cancel_futures=True)
 
     def stop_camera(self):
         if self.cap:
@@ -62,86 +109,195 @@ class AttendanceManager:
     def _get_user_role(self, user_id):
         """Helper to find if user is Student or Staff from DB"""
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
             # We check the 'class_name' field. 
             # In our models.py logic, Staff save their Department into 'class_name'.
-            # But to be precise, we can check a naming convention or just return 'User' if unsure.
-            
-            # Since we didn't add a specific 'role' column to the DB to keep it simple,
-            # we will assume everyone is a Student unless we find a way to distinguish.
-            # HOWEVER, for the CSV to look good, let's fetch the class/dept.
-            
-            cursor.execute("SELECT class_name FROM students WHERE student_id = ?", (user_id,))
-            result = cursor.fetchone()
-            conn.close()
-            
-            if result:
-                # If the value looks like a Department (e.g., "IT Dept"), we call them Staff.
-                # If it looks like a Class (e.g., "CS-101"), we call them Student.
-                # For now, let's just log the 'Class/Dept' value itself as context.
-                return result[0] 
-            return "Unknown"
-        except:
+            # For now, let's just log the 'Class/Dept' value itself as context.
+            # Uses the thread's long-lived connection (no connect/close per lookup).
+            return get_student_class(user_id) or "Unknown"
+        except Exception:
             return "Unknown"
 
-    def detect_and_mark(self, student_id, student_name):
+    def detect_and_mark(self, student_id, student_name, frame=None, next_frame=None):
         """
         Runs recognition -> Saves to DB -> Saves to CSV
+        frame: first BGR frame to use (e.g. from the GUI's capture thread).
+        next_frame: callable returning further frames for the burst (None when
+        no frame is available). Without either, frames are read from this
+        manager's own camera.
         """
+        with self.tracer.span("mark_attendance"):
+            return self._detect_and_mark(student_id, student_name, frame, next_frame)
+
+    def _read_camera(self):
         if not self.cap or not self.cap.isOpened():
-            return False, "Camera not active"
+            return None
+        with self.tracer.span("capture"):
+            ret, frame = self.cap.read()
+        return frame if ret else None
+
+    def _recognize(self, frame, student_name):
+        """
+        Burst worker: one detection per frame, shared by identity and liveness.
+        Returns (confidence %, box, live) for the student, or None if not found.
+        """
+        for res in self.recognizer.recognize_frame(frame):
+            if res['label'].lower() == student_name.lower():
+                return res['confidence'] * 100, res['box'], res.get('liveness_ok', True)
+        return None
+
+    def verify_burst(self, student_name, frame=None, next_frame=None, max_frames=None):
+        """
+        Looks at up to max_frames frames before deciding, so one blurry frame
+        does not cause a false reject.
+
+        Each frame is recognized once (detect, encode, liveness) on the burst
+        worker while the next frame is being captured. Liveness needs
+        consecutive frames, so the worker takes them in order on the camera's
+        own stream (which may already be warm from the live preview). As soon
+        as the face is live and any frame gave a confident match, the burst
+        stops; otherwise the frames' evidence is fused.
+        Returns a decision dict (also kept in self.last_decision).
+        """
+        max_frames = max_frames or self.burst_frames
+        start = time.perf_counter()
+        pending = []
+        frames_of = {}          # recognition future -> its frame
+        matches = []            # (confidence, frame, box) for frames where the student was found
+        live = False
+        frames_used = 0         # Frames submitted to the burst worker
+        recognized = 0          # Frames the worker actually finished
+
+        def collect(done):
+            nonlocal live, recognized
+            for future in done:
+                if future.cancelled():
+                    continue
+                recognized += 1
+                try:
+                    found = future.result()
+                except Exception as e:
+                    print(f"[ERROR] Burst frame failed: {e}")
+                    continue
+                if found is not None:
+                    confidence, box, frame_live = found
+                    matches.append((confidence, frames_of[future], box))
+                    live = live or frame_live
+
+        def confident():
+            return live and any(conf >= self.MIN_CONFIDENCE for conf, _, _ in matches)
+
+        def finish(futures):
+            # Drop frames still queued, but let a running one end before returning:
+            # the caller's thread is the only other user of the stream's state
+            running = [f for f in futures if not f.cancel()]
+            wait(running)
+            collect(running)
+
+        while frames_used < max_frames:
+            # 1. Next frame of the burst (captured while earlier ones are recognized)
+            if frames_used == 0 and frame is not None:
+                current = frame
+            else:
+                current = next_frame() if next_frame else None
+            if current is None:
+                break
+            frames_used += 1
+
+            # 2. Recognition in order on the burst worker
+            future = self._burst_pool.submit(self._recognize, current, student_name)
+            frames_of[future] = current
+            pending.append(future)
+
+            # 3. Early exit: live, and a confident match in any finished frame
+            done = [f for f in pending if f.done()]
+            pending = [f for f in pending if not f.done()]
+            collect(done)
+            if confident():
+                break
 
+        # Wait for the remaining frames; stop early once one is confident and the face is live
+        while pending and not confident():
+            done, rest = wait(pending, return_when=FIRST_COMPLETED)
+            pending = list(rest)
+            collect(done)
+        finish(pending)
+        early_exit = confident() and recognized < max_frames
+
+        # 4. One confident live frame decides; otherwise fuse: mean confidence over
+        # the frames where the student was found, required in at least half of them
+        best = max(matches, key=lambda m: m[0]) if matches else None
+        if confident():
+            confidence = best[0]
+        elif matches and len(matches) * 2 >= recognized:
+            confidence = sum(conf for conf, _, _ in matches) / len(matches)
+        else:
+            confidence = 0.0
+        decision = {
+            "found": bool(matches),
+            "live": live,
+            "confidence": confidence,
+            "best_frame": best[1] if best else None,
+            "box": best[2] if best else None,
+            "frames": recognized,
+            "matched_frames": len(matches),
+            "early_exit": early_exit,
+            "ms": (time.perf_counter() - start) * 1000.0,
+        }
+        self.last_decision = decision
+        print(f"[BURST] {student_name}: {decision['matched_frames']}/{recognized} frames matched, "
+              f"live={live}, confidence {decision['confidence']:.0f}% in {decision['ms']:.0f} ms"
+              f"{' (early exit)' if early_exit else ''}")
+        return decision
+
+    def _detect_and_mark(self, student_id, student_name, frame=None, next_frame=None):
         if not self.recognizer:
             return False, "Recognition Engine failed"
 
-        # 1. Capture Frame
-        ret, frame = self.cap.read()
-        if not ret:
-            return False, "Could not read frame"
+        # 1. Capture Frames (own camera unless the caller supplies frames)
+        if frame is None and next_frame is None:
+            if not self.cap or not self.cap.isOpened():
+                return False, "Camera not active"
+            next_frame = self._read_camera
 
-        # 2. Run Recognition
-        results = self.recognizer.recognize_frame(frame)
+        # 2. Run Recognition over a short burst
+        decision = self.verify_burst(student_name, frame, next_frame)
+        if decision["frames"] == 0:
+            return False, "Could not read frame"
+        timing = f" [{decision['frames']} frames, {decision['ms']:.0f} ms]"
 
         # 3. Process Results
-        match_found = False
-        confidence = 0.0
-        
-        for res in results:
-            if res['label'].lower() == student_name.lower():
-                confidence = res['confidence'] * 100
-                match_found = True
-                
-                is_live = res.get('liveness_ok', True) 
-                if not is_live:
-                    return False, "Liveness Check Failed"
-                
-                if confidence < 50:
-                    return False, f"Low Confidence ({confidence:.0f}%)"
-                break
+        if not decision["found"]:
+            return False, "Face not recognized" + timing
+        if not decision["live"]:
+            return False, "Liveness Check Failed" + timing
+        confidence = decision["confidence"]
+        if confidence < self.MIN_CONFIDENCE:
+            return False, f"Low Confidence ({confidence:.0f}%)" + timing
 
-        if match_found:
-            # Save Snapshot
-            photo_dir = os.path.join(root_dir, "attendance_photos")
-            os.makedirs(photo_dir, exist_ok=True)
-            timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-            photo_filename = f"{student_id}_{timestamp}.jpg"
-            photo_path = os.path.join(photo_dir, photo_filename)
-            cv2.imwrite(photo_path, frame)
+        # Save to DB now (visible in the history right away), Snapshot in the
+        # background -> its path is added to the record once the file exists
+        timestamp = record_attendance(user_id=student_id, status="Present", confidence=confidence, liveness=True, snapshot=None)
+        with self.tracer.span("snapshot"):
+            future = self.snapshots.save(decision["best_frame"], decision["box"])
 
-            # Save to DB
+        def save_photo(done):
             try:
-                record_attendance(user_id=student_id, status="Present", confidence=confidence, liveness=True, snapshot=photo_path)
+                photo_path = done.result()
             except Exception as e:
-                print(f"DB Error: {e}")
+                print(f"Snapshot Error: {e}")
+                return
+            if timestamp:
+                set_attendance_photo(student_id, timestamp, photo_path)
 
-            # --- ACTION: SAVE TO CSV WITH ROLE ---
-            if self.csv_logger:
+        future.add_done_callback(save_photo)
+
+        # --- ACTION: SAVE TO CSV WITH ROLE ---
+        if self.csv_logger:
+            with self.tracer.span("csv"):
                 # We fetch the "Class/Dept" info to use as the Role/Info column
                 role_info = self._get_user_role(student_id)
-                self.csv_logger.log_attendance(student_name, student_id, role_info)
+                logged = self.csv_logger.log_attendance(student_name, student_id, role_info)
+            if logged:
                 print(f"📝 Logged to CSV: {student_name} ({role_info})")
 
-            return True, f"Marked Present ({confidence:.0f}%)"
-
-        return False, "Face not recognized"
+        return True, f"Marked Present ({confidence:.0f}%)" + timing
@@ -0,0 +1,142 @@
+import threading
+import time
+from collections import deque
+import cv2
+from PySide6.QtCore import QThread, Signal
+from PySide6.QtGui import QImage
+
+from src.capture import VideoStream
+
+
+class CaptureWorker(QThread):
+    """
+    Camera preview off the GUI thread.
+
+    The thread opens the camera (a threaded VideoStream), converts and scales
+    every new frame to the preview size and publishes it as a QImage. The
+    GUI only has to turn it into a pixmap. If the GUI has not picked up the
+    previous image yet, it is replaced instead of queued, so a busy UI shows
+    the newest frame and never falls behind the camera.
+
+    Recognition results set with set_overlay() are drawn onto every preview
+    image until they are replaced, and frame_listener (if set) receives each
+    new full-resolution frame on this thread (e.g. RecognitionService.submit_frame).
+    """
+    frame_ready = Signal()   # A new preview image is waiting in take_image()
+    failed = Signal(str)     # Camera could not be opened / stream ended
+
+    def __init__(self, source=0, frame_listener=None, parent=None):
+        super().__init__(parent)
+        self.source = source
+        self.frame_listener = frame_listener
+        self.stream = None
+        self._running = False
+        self._lock = threading.Lock()
+        self._target_size = (640, 480)
+        self._image = None
+        self._frame = None          # Newest full-resolution BGR frame (for recognition)
+        self._overlay = []          # Latest recognition results, drawn on the preview
+        self._shown = deque(maxlen=30)
+        self.dropped = 0
+
+    # --- GUI THREAD ---
+    def set_target_size(self, width, height):
+        """Preview size in pixels (usually the video label's size)."""
+        with self._lock:
+            self._target_size = (max(1, width), max(1, height))
+
+    def set_overlay(self, results):
+        """Recognition results (boxes in full-frame pixels) to draw on the preview."""
+        with self._lock:
+            self._overlay = list(results)
+
+    def take_image(self):
+        """Newest preview image, or None if there is nothing new. Counts towards preview FPS."""
+        with self._lock:
+            image, self._image = self._image, None
+        if image is not None:
+            self._shown.append(time.perf_counter())
+        return image
+
+    def latest_frame(self):
+        """Newest full-resolution BGR frame (a copy), or None before the first frame."""
+        with self._lock:
+            return None if self._frame is None else self._frame.copy()
+
+    @property
+    def fps(self):
+        """Preview frames actually handed to the GUI per second."""
+        if len(self._shown) < 2:
+            return 0.0
+        span = self._shown[-1] - self._shown[0]
+        return (len(self._shown) - 1) / span if span > 0 else 0.0
+
+    def stop(self):
+        self._running = False
+        self.wait(2000)
+
+    # --- WORKER THREAD ---
+    def run(self):
+        self._running = True
+        self.stream = VideoStream(src=self.source)
+        if not self.stream.grabbed:
+            self.stream.stop()
+            self.failed.emit("Camera could not be opened")
+            return
+        self.stream.start()
+
+        last_seq = 0
+        try:
+            while self._running:
+                last_seq, frame = self.stream.read_next(last_seq, timeout=0.5)
+                if frame is None:
+                    if self.stream.stopped:
+                        self.failed.emit("Camera stream ended")
+                        break
+                    continue
+
+                if self.frame_listener:
+                    self.frame_listener(frame)
+
+                image = self._to_image(frame)
+                with self._lock:
+                    self._frame = frame
+                    pending = self._image is not None
+                    if pending:
+                        self.dropped += 1 # GUI still busy: replace, don't queue
+                    self._image = image
+                if not pending:
+                    self.frame_ready.emit()
+        finally:
+            self.stream.stop()
+
+    def _to_image(self, frame):
+        """BGR frame -> RGB QImage scaled to fit the target size (aspect ratio kept)."""
+        with self._lock:
+            target_w, target_h = self._target_size
+            overlay = self._overlay
+        h, w = frame.shape[:2]
+        fit = min(target_w / w, target_h / h)
+        size = (max(1, int(w * fit)), max(1, int(h * fit)))
+        interpolation = cv2.INTER_AREA if fit < 1.0 else cv2.INTER_LINEAR
+        preview = cv2.resize(frame, size, interpolation=interpolation)
+        if overlay:
+            draw_overlay(preview, overlay, fit)
+        rgb = cv2.cvtColor(preview, cv2.COLOR_BGR2RGB)
+        # QImage does not own the buffer: copy so it outlives `rgb`
+        return QImage(rgb.data, size[0], size[1], 3 * size[0], QImage.Format_RGB888).copy()
+
+
+def draw_overlay(image, results, scale):
+    """Draws face boxes and labels (same colours as the recognition HUD) on a scaled BGR preview."""
+    for res in results:
+        top, right, bottom, left = [int(v * scale) for v in res["box"]]
+        if not res.get("liveness_ok", True):
+            color, text = (0, 0, 255), "Liveness check..." # Red
+        elif res["label"] == "Unknown":
+            color, text = (0, 165, 255), "Unknown"         # Orange
+        else:
+            color, text = (0, 255, 0), f"{res['label']} ({res['confidence'] * 100:.0f}%)" # Green
+
+        cv2.rectangle(image, (left, top), (right, bottom), color, 2)
+        cv2.putText(image, text, (left, max(12, top - 6)), cv2.FONT_HERSHEY_SIMPLEX, 0.5, color, 1)
@@ -1,16 +1,192 @@
+import atexit
+import itertools
+import queue
+import re
 import sqlite3
+import threading
+import time
 from pathlib import Path
-from datetime import datetime
+from datetime import datetime, timezone
 
 # Define DB Path
 DB_PATH = Path("database/attendance.db")
 DB_PATH.parent.mkdir(parents=True, exist_ok=True)
 
+# --- SQL (reused on long-lived connections, so sqlite3's statement cache keeps them prepared) ---
+SQL_ADD_STUDENT = """
+    INSERT INTO students (student_id, password, name, class_name)
+    VALUES (?, ?, ?, ?)
+"""
+SQL_GET_STUDENT = """
+    SELECT id, student_id, name, class_name
+    FROM students
+    WHERE student_id = ? AND password = ?
+"""
+SQL_GET_CLASS = "SELECT class_name FROM students WHERE student_id = ?"
+SQL_HISTORY = """
+    SELECT timestamp, name, photo_path, confidence, status
+    FROM attendance
+    WHERE student_id = ?
+    ORDER BY timestamp DESC
+"""
+HISTORY_PAGE_SIZE = 50
+# Search text that is the start of a stored timestamp ('2025', '2025-03-14 09:')
+TIMESTAMP_PREFIX = re.compile(r"\d{4}(-[\d: -]*)?")
+# Name lookup folded into the insert (no separate SELECT round trip per record)
+SQL_INSERT_ATTENDANCE = """
+    INSERT INTO attendance (student_id, name, timestamp, status, confidence, photo_path)
+    SELECT ?, COALESCE((SELECT name FROM students WHERE student_id = ?), 'Unknown'), ?, ?, ?, ?
+"""
+# Snapshot path filled in once the file is written (newest matching record without one)
+SQL_SET_PHOTO = """
+    UPDATE attendance SET photo_path = ?
+    WHERE id = (SELECT id FROM attendance
+                WHERE student_id = ? AND timestamp = ? AND photo_path IS NULL
+                ORDER BY id DESC LIMIT 1)
+"""
+
+# --- MIGRATIONS ---
+# Applied in order on top of the base tables; PRAGMA user_version records the
+# last one applied. Append new entries, never edit or reorder existing ones.
+MIGRATIONS = [
+    (1, "Indexes for per-student history and date-range queries", [
+        # Serves WHERE student_id = ? ORDER BY timestamp DESC, id DESC (rowid is part of every index)
+        "CREATE INDEX IF NOT EXISTS idx_attendance_student_time ON attendance (student_id, timestamp)",
+        "CREATE INDEX IF NOT EXISTS idx_attendance_time ON attendance (timestamp)",
+    ]),
+]
+
+# --- CONNECTIONS ---
+_local = threading.local()
+
+
+def get_connection():
+    """
+    Long-lived connection for the calling thread (sqlite3 connections must
+    not be shared between threads). WAL lets the UI read while the writer
+    commits; synchronous=NORMAL skips the fsync on every commit (WAL stays
+    consistent, at worst the last commits are lost on power failure).
+    """
+    conn = getattr(_local, "conn", None)
+    if conn is None:
+        conn = sqlite3.connect(DB_PATH, timeout=10.0, cached_statements=64)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        _local.conn = conn
+    return conn
+
+
+# --- BACKGROUND WRITER ---
+class AttendanceWriter:
+    """
+    Background thread that writes attendance records in batches.
+
+    record() only enqueues, so marking attendance never waits for the disk.
+    The thread collects everything queued within `interval` seconds (up to
+    `batch_size` statements) and runs it in a single transaction, in the
+    order it was queued.
+    """
+
+    def __init__(self, batch_size=100, interval=0.2):
+        self.batch_size = batch_size
+        self.interval = interval
+        self._queue = queue.Queue()
+        self._pending = 0
+        self._cond = threading.Condition()
+        self._thread = None
+        self._start_lock = threading.Lock()
+        self.written = 0
+        self.batches = 0
+
+    def _ensure_started(self):
+        with self._start_lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="attendance-writer", daemon=True)
+                self._thread.start()
+
+    def record(self, row, sql=SQL_INSERT_ATTENDANCE):
+        """Queues one parameter tuple for sql (an attendance insert by default)."""
+        self._ensure_started()
+        with self._cond:
+            self._pending += 1
+        self._queue.put((sql, row))
+
+    def _run(self):
+        while True:
+            row = self._queue.get()
+            if row is None:
+                return
+            batch = [row]
+
+            # Collect whatever else arrives shortly after
+            deadline = time.monotonic() + self.interval
+            stop = False
+            while len(batch) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    row = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if row is None:
+                    stop = True
+                    break
+                batch.append(row)
+
+            self._write(batch)
+            with self._cond:
+                self._pending -= len(batch)
+                self._cond.notify_all()
+            if stop:
+                return
+
+    def _write(self, batch):
+        conn = get_connection()
+        try:
+            with conn:
+                # Consecutive statements of the same kind go in one executemany
+                for sql, items in itertools.groupby(batch, key=lambda item: item[0]):
+                    conn.executemany(sql, [row for _, row in items])
+            self.written += len(batch)
+            self.batches += 1
+        except Exception as e:
+            print(f"Database Error (attendance writer): {e}")
+            # Retry one by one so a single bad row does not lose the batch
+            for sql, row in batch:
+                try:
+                    with conn:
+                        conn.execute(sql, row)
+                    self.written += 1
+                except Exception as row_error:
+                    print(f"Database Error (record_attendance): {row_error}")
+
+    def flush(self, timeout=5.0):
+        """Waits until everything queued so far is committed. Returns False on timeout."""
+        with self._cond:
+            return self._cond.wait_for(lambda: self._pending == 0, timeout=timeout)
+
+    def stop(self, timeout=5.0):
+        """Writes the remaining queue and stops the thread."""
+        if self._thread is not None and self._thread.is_alive():
+            self._queue.put(None)
+            self._thread.join(timeout=timeout)
+
+
+_writer = AttendanceWriter()
+atexit.register(_writer.stop)
+
+
+def flush_pending(timeout=5.0):
+    """Blocks until queued attendance records are in the database."""
+    return _writer.flush(timeout)
+
+
 def init_db():
     """Initialize the database tables."""
-    conn = sqlite3.connect(DB_PATH)
+    conn = get_connection()
     cursor = conn.cursor()
-    
+
     # Students Table
     cursor.execute("""
         CREATE TABLE IF NOT EXISTS students (
@@ -34,21 +210,32 @@ def init_db():
             photo_path TEXT
         )
     """)
-    
+
     conn.commit()
-    conn.close()
+    migrate(conn)
+
+def migrate(conn=None):
+    """Applies pending MIGRATIONS, each in its own transaction. Returns the schema version."""
+    conn = conn or get_connection()
+    version = conn.execute("PRAGMA user_version").fetchone()[0]
+    for target, description, statements in MIGRATIONS:
+        if target <= version:
+            continue
+        print(f"[INFO] Migrating database to v{target}: {description}")
+        with conn:
+            conn.execute("BEGIN") # DDL does not open a transaction implicitly
+            for statement in statements:
+                conn.execute(statement)
+            conn.execute(f"PRAGMA user_version = {int(target)}")
+        version = target
+    return version
 
 def add_student(student_id, password, name, class_name=""):
     """Register a new student."""
     try:
-        conn = sqlite3.connect(DB_PATH)
-        cursor = conn.cursor()
-        cursor.execute("""
-            INSERT INTO students (student_id, password, name, class_name) 
-            VALUES (?, ?, ?, ?)
-        """, (student_id, password, name, class_name))
-        conn.commit()
-        conn.close()
+        conn = get_connection()
+        with conn:
+            conn.execute(SQL_ADD_STUDENT, (student_id, password, name, class_name))
         return True
     except sqlite3.IntegrityError:
         return False
@@ -58,53 +245,103 @@ def add_student(student_id, password, name, class_name=""):
 
 def get_student(student_id, password):
     """Verify login."""
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-    cursor.execute("""
-        SELECT id, student_id, name, class_name 
-        FROM students 
-        WHERE student_id = ? AND password = ?
-    """, (student_id, password))
-    row = cursor.fetchone()
-    conn.close()
-    return row
+    return get_connection().execute(SQL_GET_STUDENT, (student_id, password)).fetchone()
+
+def get_student_class(student_id):
+    """Class (or department, for staff) of a student, None if unknown."""
+    row = get_connection().execute(SQL_GET_CLASS, (student_id,)).fetchone()
+    return row[0] if row else None
 
 def get_attendance_history(student_id):
-    """Fetch history for the UI."""
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-    cursor.execute("""
-        SELECT timestamp, name, photo_path, confidence, status 
-        FROM attendance 
-        WHERE student_id = ? 
-        ORDER BY timestamp DESC
-    """, (student_id,))
-    rows = cursor.fetchall()
-    conn.close()
-    return rows
+    """Fetch the whole history (prefer get_attendance_page for the UI)."""
+    flush_pending(timeout=1.0) # Include records that are still queued
+    return get_connection().execute(SQL_HISTORY, (student_id,)).fetchall()
+
+def _db_timestamp(value):
+    """datetime/date -> the stored 'YYYY-MM-DD HH:MM:SS' format; strings pass through."""
+    if value is None or isinstance(value, str):
+        return value
+    if isinstance(value, datetime):
+        return value.strftime("%Y-%m-%d %H:%M:%S")
+    return value.strftime("%Y-%m-%d 00:00:00")
+
+def _search_clause(search):
+    """
+    Search text -> (WHERE condition, params). A timestamp prefix becomes a
+    range on timestamp, which the history index can seek to; anything else
+    matches the status, timestamp or confidence as shown in the history
+    ("50%", "N/A") as a substring (case-insensitive).
+    """
+    text = search.strip()
+    if TIMESTAMP_PREFIX.fullmatch(text):
+        # '~' sorts after every character a timestamp can contain
+        return "timestamp >= ? AND timestamp < ?", [text, text + "~"]
+    pattern = "%" + text.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+    confidence_text = "CASE WHEN confidence THEN printf('%.0f%%', confidence) ELSE 'N/A' END"
+    return (f"(status LIKE ? ESCAPE '\\' OR timestamp LIKE ? ESCAPE '\\' OR {confidence_text} LIKE ? ESCAPE '\\')",
+            [pattern, pattern, pattern])
+
+def get_attendance_page(student_id, page_size=HISTORY_PAGE_SIZE, after=None, start=None, end=None, search=None):
+    """
+    One page of history, newest first, using keyset pagination: pass the
+    cursor returned with the previous page as `after`. Each page is an index
+    range scan, so its cost does not grow with the table or the page number.
+
+    start / end: optional date range (start inclusive, end exclusive), as
+    datetime/date or 'YYYY-MM-DD[ HH:MM:SS]' strings in UTC like the stored timestamps.
+    search: optional text filter (see _search_clause), applied in SQL so
+    only matching rows are read and paged.
+    Returns (rows, cursor); rows have the get_attendance_history columns,
+    cursor is None on the last page.
+    """
+    flush_pending(timeout=1.0) # Include records that are still queued
+
+    where = ["student_id = ?"]
+    params = [student_id]
+    if after is not None:
+        where.append("(timestamp, id) < (?, ?)")
+        params.extend(after)
+    if start is not None:
+        where.append("timestamp >= ?")
+        params.append(_db_timestamp(start))
+    if end is not None:
+        where.append("timestamp < ?")
+        params.append(_db_timestamp(end))
+    if search and search.strip():
+        condition, search_params = _search_clause(search)
+        where.append(condition)
+        params.extend(search_params)
+    params.append(page_size + 1) # One extra row tells whether another page exists
+
+    rows = get_connection().execute(f"""
+        SELECT id, timestamp, name, photo_path, confidence, status
+        FROM attendance
+        WHERE {" AND ".join(where)}
+        ORDER BY timestamp DESC, id DESC
+        LIMIT ?
+    """, params).fetchall()
+
+    cursor = None
+    if len(rows) > page_size:
+        rows = rows[:page_size]
+        cursor = (rows[-1][1], rows[-1][0])
+    return [row[1:] for row in rows], cursor
 
 def record_attendance(user_id, status, confidence, liveness, snapshot):
     """
-    Records attendance into the database.
-    This is the function your error says is missing!
+    Queues an attendance record for the background writer and returns
+    immediately. The student's name is looked up inside the insert.
+    Returns the record's timestamp (for set_attendance_photo), None on failure.
     """
     try:
-        conn = sqlite3.connect(DB_PATH)
-        cursor = conn.cursor()
-        
-        # Fetch name to keep records complete
-        cursor.execute("SELECT name FROM students WHERE student_id = ?", (user_id,))
-        result = cursor.fetchone()
-        name = result[0] if result else "Unknown"
-
-        cursor.execute("""
-            INSERT INTO attendance (student_id, name, status, confidence, photo_path)
-            VALUES (?, ?, ?, ?, ?)
-        """, (user_id, name, status, confidence, snapshot))
-        
-        conn.commit()
-        conn.close()
-        return True
+        # Same format and timezone as CURRENT_TIMESTAMP, taken now rather than at write time
+        timestamp = datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M:%S")
+        _writer.record((user_id, user_id, timestamp, status, confidence, snapshot))
+        return timestamp
     except Exception as e:
         print(f"Database Error (record_attendance): {e}")
-        return False
+        return None
+
+def set_attendance_photo(user_id, timestamp, photo_path):
+    """Queues the snapshot path of a record made with record_attendance(snapshot=None)."""
+    _writer.record((photo_path, user_id, timestamp), sql=SQL_SET_PHOTO)
@@ -0,0 +1,84 @@
+from PySide6.QtCore import Qt, QAbstractTableModel, QModelIndex
+
+from app import database
+
+
+class HistoryModel(QAbstractTableModel):
+    """
+    Attendance history of one user for a QTableView, loaded lazily.
+
+    Only the first page is queried up front; the view asks for more
+    (canFetchMore / fetchMore) as the user scrolls towards the end. Pages
+    come from database.get_attendance_page, so each one is a keyset index
+    scan and the search filter runs in SQL instead of over the whole history.
+    """
+    COLUMNS = ["Time (UTC)", "Status", "Confidence"]
+
+    def __init__(self, page_size=database.HISTORY_PAGE_SIZE, parent=None):
+        super().__init__(parent)
+        self.page_size = page_size
+        self.student_id = None
+        self.search = ""
+        self._rows = []
+        self._cursor = None
+        self._has_more = False
+
+    def set_query(self, student_id, search=""):
+        """Shows student_id's history filtered by search, starting again at the newest record."""
+        self.student_id = student_id
+        self.search = search.strip()
+        self.refresh()
+
+    def refresh(self):
+        """Reloads the first page (e.g. after a new record)."""
+        self.beginResetModel()
+        self._rows, self._cursor, self._has_more = [], None, self.student_id is not None
+        self.endResetModel()
+        self.fetchMore()
+
+    # --- QAbstractTableModel ---
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._rows)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.COLUMNS)
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role == Qt.DisplayRole and orientation == Qt.Horizontal:
+            return self.COLUMNS[section]
+        return None
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        timestamp, _, _, confidence, status = self._rows[index.row()]
+        column = index.column()
+        if role == Qt.DisplayRole:
+            if column == 0:
+                return str(timestamp)
+            if column == 1:
+                return status or "Present"
+            return f"{confidence:.0f}%" if confidence else "N/A"
+        if role == Qt.TextAlignmentRole and column == 2:
+            return int(Qt.AlignRight | Qt.AlignVCenter)
+        return None
+
+    def canFetchMore(self, parent=QModelIndex()):
+        return not parent.isValid() and self._has_more
+
+    def fetchMore(self, parent=QModelIndex()):
+        if parent.isValid() or not self._has_more:
+            return
+        try:
+            rows, cursor = database.get_attendance_page(self.student_id, self.page_size,
+                                                        after=self._cursor, search=self.search)
+        except Exception as e:
+            print(f"Database Error (history page): {e}")
+            rows, cursor = [], None
+
+        self._cursor, self._has_more = cursor, cursor is not None
+        if rows:
+            first = len(self._rows)
+            self.beginInsertRows(QModelIndex(), first, first + len(rows) - 1)
+            self._rows.extend(rows)
+            self.endInsertRows()
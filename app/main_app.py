@@ -1,18 +1,21 @@
 import sys
-import cv2
+import os
 from PySide6.QtWidgets import (
     QApplication, QMainWindow, QLabel, QPushButton, 
     QVBoxLayout, QHBoxLayout, QWidget, QLineEdit, 
-    QDialog, QFormLayout, QMessageBox, QScrollArea, QCheckBox
+    QDialog, QFormLayout, QMessageBox, QCheckBox, QTableView, QHeaderView
 )
 from PySide6.QtCore import Qt, QTimer
-from PySide6.QtGui import QImage, QPixmap
+from PySide6.QtGui import QPixmap
 
 # --- IMPORTS ---
 from app.auth import AuthManager
 from app import database
 from app.models import Student, Staff  # <--- IMPORT STAFF HERE
 from app.attendance import AttendanceManager
+from app.capture_worker import CaptureWorker
+from app.recognition_service import RecognitionService
+from app.history_model import HistoryModel
 
 # --- REGISTER DIALOG (Updated for Staff) ---
 class RegisterDialog(QDialog):
@@ -89,17 +92,22 @@ class MainApp(QMainWindow):
         self.setGeometry(100, 100, 900, 600)
         
         self.auth_manager = AuthManager()
-        self.attendance_manager = AttendanceManager()
+        # Camera per deployment: ATTENDANCE_CAMERA=1 or a video/stream URL (default: device 0)
+        self.attendance_manager = AttendanceManager(camera_source=os.environ.get("ATTENDANCE_CAMERA", "0"))
         database.init_db()
 
-        self.timer = QTimer()
-        self.timer.timeout.connect(self.update_frame)
+        # Camera preview runs on its own thread (capture, conversion, scaling)
+        self.capture = None
+
+        # Live recognition + marking on a background thread (motion-gated)
+        self.recognition = RecognitionService(self.attendance_manager).start()
+        self.recognition.results_ready.connect(self.show_results)
+        self.recognition.mark_finished.connect(self.mark_finished)
 
         self.show_login_screen()
 
     def clear_window(self):
-        if self.timer.isActive():
-            self.timer.stop()
+        self.stop_preview()
         self.attendance_manager.stop_camera()
         
         if self.centralWidget():
@@ -174,6 +182,9 @@ class MainApp(QMainWindow):
         self.video_label.setAlignment(Qt.AlignCenter)
         self.video_label.setStyleSheet("background-color: black; color: white; border-radius: 10px;")
         self.video_label.setMinimumSize(480, 360)
+
+        self.fps_label = QLabel("")
+        self.fps_label.setStyleSheet("color: gray; font-size: 11px;")
         
         self.status_label = QLabel("Status: Ready")
         self.status_label.setStyleSheet("font-weight: bold; color: gray;")
@@ -195,6 +206,7 @@ class MainApp(QMainWindow):
 
         left_panel.addWidget(welcome_label)
         left_panel.addWidget(self.video_label)
+        left_panel.addWidget(self.fps_label)
         left_panel.addWidget(self.status_label)
         left_panel.addLayout(btn_layout)
         left_panel.addWidget(logout_btn)
@@ -208,18 +220,32 @@ class MainApp(QMainWindow):
 
         self.search_bar = QLineEdit()
         self.search_bar.setPlaceholderText("Search history...")
-        self.search_bar.textChanged.connect(self.filter_history)
-
-        self.history_scroll = QScrollArea()
-        self.history_scroll.setWidgetResizable(True)
-        self.history_content = QLabel("Loading...")
-        self.history_content.setAlignment(Qt.AlignTop)
-        self.history_content.setStyleSheet("padding: 10px;")
-        self.history_scroll.setWidget(self.history_content)
+        self.search_bar.textChanged.connect(self.search_changed)
+
+        # Query once typing pauses, not on every keystroke
+        self.search_timer = QTimer(self)
+        self.search_timer.setSingleShot(True)
+        self.search_timer.setInterval(250)
+        self.search_timer.timeout.connect(lambda: self.filter_history(self.search_bar.text()))
+
+        # Rows are fetched page by page while scrolling
+        self.history_model = HistoryModel(parent=self)
+        self.history_view = QTableView()
+        self.history_view.setModel(self.history_model)
+        self.history_view.setSelectionBehavior(QTableView.SelectRows)
+        self.history_view.setEditTriggers(QTableView.NoEditTriggers)
+        self.history_view.verticalHeader().hide()
+        self.history_view.verticalHeader().setSectionResizeMode(QHeaderView.Fixed)
+        self.history_view.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
+
+        self.history_empty = QLabel("")
+        self.history_empty.setStyleSheet("color: gray; padding: 10px;")
+        self.history_empty.hide()
 
         right_panel.addWidget(hist_title)
         right_panel.addWidget(self.search_bar)
-        right_panel.addWidget(self.history_scroll)
+        right_panel.addWidget(self.history_view)
+        right_panel.addWidget(self.history_empty)
 
         main_layout.addLayout(left_panel, 65)
         main_layout.addLayout(right_panel, 35)
@@ -232,49 +258,71 @@ class MainApp(QMainWindow):
 
     # --- CAMERA LOGIC ---
     def toggle_camera(self):
-        if not self.timer.isActive():
-            self.attendance_manager.start_camera()
-            self.timer.start(30)
+        if self.capture is None:
+            self.capture = CaptureWorker(self.attendance_manager.camera_source,
+                                         frame_listener=self.recognition.submit_frame)
+            self.capture.set_target_size(self.video_label.width(), self.video_label.height())
+            self.capture.frame_ready.connect(self.update_frame)
+            self.capture.failed.connect(self.camera_failed)
+            self.capture.start()
             self.start_btn.setText("Stop Camera")
             self.mark_btn.setEnabled(True)
             self.status_label.setText("Status: Camera Active")
         else:
-            self.timer.stop()
-            self.attendance_manager.stop_camera()
+            self.stop_preview()
             self.video_label.setPixmap(QPixmap())
             self.video_label.setText("Camera Offline")
+            self.fps_label.setText("")
             self.start_btn.setText("Start Camera")
             self.mark_btn.setEnabled(False)
             self.status_label.setText("Status: Ready")
 
+    def stop_preview(self):
+        if self.capture is not None:
+            self.capture.frame_ready.disconnect(self.update_frame)
+            self.capture.stop()
+            self.capture = None
+
+    def camera_failed(self, message):
+        if self.capture is not None:
+            self.toggle_camera()
+        self.status_label.setText(f"❌ {message}")
+
     def update_frame(self):
-        cap = self.attendance_manager.cap
-        if cap and cap.isOpened():
-            ret, frame = cap.read()
-            if ret:
-                frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-                h, w, ch = frame.shape
-                bytes_per_line = ch * w
-                q_img = QImage(frame.data, w, h, bytes_per_line, QImage.Format_RGB888)
-                
-                scaled_pixmap = QPixmap.fromImage(q_img).scaled(
-                    self.video_label.size(), Qt.KeepAspectRatio, Qt.SmoothTransformation
-                )
-                self.video_label.setPixmap(scaled_pixmap)
+        """Shows the newest preview image (already converted and scaled by the capture thread)."""
+        if self.capture is None:
+            return
+        q_img = self.capture.take_image()
+        if q_img is None:
+            return
+        self.video_label.setPixmap(QPixmap.fromImage(q_img))
+        self.capture.set_target_size(self.video_label.width(), self.video_label.height())
+        self.fps_label.setText(f"Preview: {self.capture.fps:.1f} FPS | "
+                               f"Recognition: {self.recognition.duty_cycle * 100:.0f}% of frames")
+
+    def show_results(self, results):
+        """Latest live recognition results -> overlays on the preview."""
+        if self.capture is not None:
+            self.capture.set_overlay(results)
 
     def mark_attendance(self):
         user = self.auth_manager.get_current_user()
         if not user: return
 
-        self.timer.stop()
-        self.status_label.setText("Status: Scanning Face...")
-        QApplication.processEvents()
+        frame = self.capture.latest_frame() if self.capture else None
+        if frame is None:
+            self.status_label.setText("❌ No camera frame yet")
+            return
 
-        success, msg = self.attendance_manager.detect_and_mark(
-            student_id=user.get_id(),
-            student_name=user.name
-        )
+        # Runs on the recognition thread; the preview keeps streaming
+        self.mark_btn.setEnabled(False)
+        self.status_label.setText("Status: Scanning Face...")
+        self.status_label.setStyleSheet("font-weight: bold; color: gray;")
+        self.recognition.mark(user.get_id(), user.name, frame)
 
+    def mark_finished(self, success, msg):
+        if self.capture is not None:
+            self.mark_btn.setEnabled(True)
         if success:
             self.status_label.setText(f"✅ {msg}")
             self.status_label.setStyleSheet("color: green; font-weight: bold;")
@@ -283,7 +331,14 @@ class MainApp(QMainWindow):
             self.status_label.setText(f"❌ {msg}")
             self.status_label.setStyleSheet("color: red; font-weight: bold;")
 
-        self.timer.start(30)
+    def closeEvent(self, event):
+        self.stop_preview()
+        self.recognition.stop()
+        self.attendance_manager.shutdown()
+        trace_path = self.attendance_manager.export_trace()
+        if trace_path:
+            print(f"[INFO] Trace saved to {trace_path}")
+        super().closeEvent(event)
 
     def logout_clicked(self):
         self.auth_manager.logout()
@@ -291,29 +346,21 @@ class MainApp(QMainWindow):
 
     # --- HISTORY LOGIC ---
     def refresh_history(self):
-        self.filter_history("")
+        self.filter_history(self.search_bar.text())
+
+    def search_changed(self, _text):
+        self.search_timer.start() # Restarts the wait on every keystroke
 
     def filter_history(self, search_text):
         user = self.auth_manager.get_current_user()
         if not user: return
 
-        records = database.get_attendance_history(user.get_id())
-        
-        if not records:
-            self.history_content.setText("No records found.")
-            return
-
-        display_text = ""
-        for row in records:
-            timestamp = str(row[0])
-            status = "Late" if row[4] else "Present"
-            confidence = f"{row[3]:.0f}%" if row[3] else "N/A"
-            line = f"[{timestamp}] {status} (Conf: {confidence})"
-
-            if search_text.lower() in line.lower():
-                display_text += line + "\n\n"
+        self.search_timer.stop()
+        self.history_model.set_query(user.get_id(), search_text)
 
-        self.history_content.setText(display_text if display_text else "No matching records.")
+        empty = self.history_model.rowCount() == 0
+        self.history_empty.setText("No matching records." if search_text.strip() else "No records found.")
+        self.history_empty.setVisible(empty)
 
 if __name__ == "__main__":
     app = QApplication(sys.argv)
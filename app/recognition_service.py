@@ -0,0 +1,139 @@
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from PySide6.QtCore import QObject, Signal
+
+from src.capture import MotionGate
+
+
+class RecognitionService(QObject):
+    """
+    Runs recognition for the desktop app on one background thread.
+
+    Two kinds of work share that thread (so the recognizer's tracking and
+    liveness state is only ever touched by it):
+    - Live frames from the preview (submit_frame). Only the newest waiting
+      frame is kept, and a MotionGate skips frames while the scene is static.
+      Results are published with results_ready for the preview overlays.
+    - Attendance marks (mark). Each returns a Future and, when done, also
+      emits mark_finished. Marks run before waiting live frames.
+
+    Because live frames keep the default stream's liveness state up to date,
+    a blink seen in the preview already counts when the user presses "Mark".
+    A mark's burst verification takes its further frames from the live feed.
+    """
+    results_ready = Signal(object)      # list of result dicts of the newest processed frame
+    mark_finished = Signal(bool, str)   # (success, message) of detect_and_mark
+
+    def __init__(self, manager, motion_gate=True, parent=None):
+        super().__init__(parent)
+        self.manager = manager
+        self.gate = MotionGate() if motion_gate else None
+        self.latest_results = []
+        self.processed = 0
+        self.dropped = 0
+        self._cond = threading.Condition()
+        self._frame = None          # Newest live frame not processed yet
+        self._last_frame = None     # Newest live frame seen (used by marks without a frame)
+        self._marks = deque()
+        self._running = False
+        self._thread = None
+
+    def start(self):
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name="recognition-service", daemon=True)
+        self._thread.start()
+        return self
+
+    def submit_frame(self, frame):
+        """Offers a live frame (thread-safe). Replaces any frame still waiting."""
+        with self._cond:
+            if self._frame is not None:
+                self.dropped += 1
+            self._frame = frame
+            self._last_frame = frame
+            self._cond.notify()
+
+    def mark(self, student_id, student_name, frame=None):
+        """Queues detect_and_mark; frame defaults to the newest live frame. Returns a Future of (success, message)."""
+        future = Future()
+        with self._cond:
+            self._marks.append((future, student_id, student_name, frame))
+            self._cond.notify()
+        return future
+
+    def _run(self):
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: not self._running or self._marks or self._frame is not None)
+                if not self._running:
+                    break
+                if self._marks:
+                    job, frame = self._marks.popleft(), self._last_frame
+                else:
+                    job, frame, self._frame = None, self._frame, None
+
+            if job is not None:
+                self._mark(job, frame)
+            else:
+                self._recognize(frame)
+
+    def _mark(self, job, last_frame):
+        future, student_id, student_name, frame = job
+        if not future.set_running_or_notify_cancel():
+            return
+        try:
+            frame = frame if frame is not None else last_frame
+            if frame is None:
+                result = (False, "No camera frame yet")
+            else:
+                # Further burst frames come straight from the live preview
+                result = self.manager.detect_and_mark(student_id, student_name, frame=frame,
+                                                      next_frame=self._wait_frame)
+            future.set_result(result)
+            self.mark_finished.emit(*result)
+        except Exception as e:
+            future.set_exception(e)
+            self.mark_finished.emit(False, f"Error: {e}")
+
+    def _wait_frame(self, timeout=0.5):
+        """Takes the next live frame (waiting up to timeout), None if none arrives."""
+        with self._cond:
+            self._cond.wait_for(lambda: self._frame is not None or not self._running, timeout=timeout)
+            frame, self._frame = self._frame, None
+            return frame
+
+    def _recognize(self, frame):
+        recognizer = self.manager.recognizer
+        if recognizer is None:
+            return
+        # Static scene: nothing to update, the last overlays stay valid
+        if self.gate and not self.gate.check(frame, faces_present=bool(self.latest_results)):
+            return
+        try:
+            start = time.perf_counter()
+            results = recognizer.recognize_frame(frame)
+            if self.gate:
+                self.gate.record(time.perf_counter() - start)
+        except Exception as e:
+            print(f"[ERROR] Live recognition failed: {e}")
+            return
+        self.latest_results = results
+        self.processed += 1
+        self.results_ready.emit(results)
+
+    @property
+    def duty_cycle(self):
+        return self.gate.duty_cycle if self.gate else 1.0
+
+    def stop(self):
+        with self._cond:
+            self._running = False
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout=2.0)
+        # Marks that never ran
+        while self._marks:
+            future = self._marks.popleft()[0]
+            future.cancel()
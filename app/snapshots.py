@@ -0,0 +1,86 @@
+import hashlib
+import os
+from concurrent.futures import ThreadPoolExecutor
+import cv2
+
+# Encoder settings per format: (extension, quality flag)
+FORMATS = {
+    "jpg": (".jpg", cv2.IMWRITE_JPEG_QUALITY),
+    "webp": (".webp", cv2.IMWRITE_WEBP_QUALITY),
+    "png": (".png", None),    # Lossless, quality ignored
+}
+
+
+class SnapshotWriter:
+    """
+    Writes attendance snapshots on a background thread.
+
+    save() returns a Future right away; encoding and disk I/O happen on the
+    writer thread. By default only a face thumbnail is stored (a few KB
+    instead of a full-resolution frame). Files are named after the SHA-1 of
+    their encoded bytes, so an identical snapshot is written only once.
+    """
+
+    def __init__(self, directory, fmt="jpg", quality=85, thumbnail_size=160, full_frame=False, margin=0.3,
+                 workers=1):
+        if fmt not in FORMATS:
+            raise ValueError(f"Unknown snapshot format '{fmt}'. Choose from: {', '.join(FORMATS)}")
+        self.directory = directory
+        self.fmt = fmt
+        self.quality = quality
+        self.thumbnail_size = thumbnail_size  # Longest side of the face thumbnail, in pixels
+        self.full_frame = full_frame          # Store the whole frame instead of the face crop
+        self.margin = margin                  # Context around the face box, as a fraction of its size
+        os.makedirs(directory, exist_ok=True)
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="snapshot")
+
+    def save(self, frame, box=None):
+        """
+        Queues a snapshot of `frame` (BGR). box: (top, right, bottom, left) of
+        the face to crop; without it (or with full_frame) the whole frame is kept.
+        Returns a Future resolving to the file path.
+        """
+        # Copy now: the caller's frame buffer may be reused by the capture thread
+        if box is None or self.full_frame:
+            image = frame.copy()
+            thumbnail = False
+        else:
+            image = self._crop(frame, box).copy()
+            thumbnail = True
+        return self._pool.submit(self._write, image, thumbnail)
+
+    def _crop(self, frame, box):
+        top, right, bottom, left = box
+        h, w = frame.shape[:2]
+        my, mx = int((bottom - top) * self.margin), int((right - left) * self.margin)
+        y0, y1 = max(0, top - my), min(h, bottom + my)
+        x0, x1 = max(0, left - mx), min(w, right + mx)
+        if y1 <= y0 or x1 <= x0:
+            return frame
+        return frame[y0:y1, x0:x1]
+
+    def _write(self, image, thumbnail):
+        if thumbnail:
+            h, w = image.shape[:2]
+            fit = self.thumbnail_size / max(h, w)
+            if fit < 1.0:
+                image = cv2.resize(image, (max(1, int(w * fit)), max(1, int(h * fit))), interpolation=cv2.INTER_AREA)
+
+        ext, quality_flag = FORMATS[self.fmt]
+        params = [quality_flag, int(self.quality)] if quality_flag is not None else []
+        ok, encoded = cv2.imencode(ext, image, params)
+        if not ok:
+            raise RuntimeError(f"Could not encode snapshot as {self.fmt}")
+
+        data = encoded.tobytes()
+        path = os.path.join(self.directory, hashlib.sha1(data).hexdigest() + ext)
+        if not os.path.exists(path): # Same content -> same name, nothing to write
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        return path
+
+    def close(self, wait=True):
+        """Stops accepting snapshots; with wait, finishes the queued ones first."""
+        self._pool.shutdown(wait=wait)
@@ -0,0 +1,191 @@
+import cv2
+import argparse
+import csv
+import os
+import queue
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.bmp')
+
+# One engine per worker process (models are loaded once per process, not per frame)
+_recognizer = None
+
+
+def _init_worker(encodings_path, predictor_path, index, detector="hog"):
+    global _recognizer
+    from src.recognizer.face_recognition_system import FaceRecognitionSystem
+    _recognizer = FaceRecognitionSystem(model_path=encodings_path, predictor_path=predictor_path, index=index,
+                                        detector=detector)
+
+
+def _recognize(item):
+    """
+    Worker: recognizes one frame. Frames arrive in any order on any worker, so
+    each one gets fresh tracking state and only identity runs (detect + encode
+    + match; no landmarks/head pose for liveness, which needs frame order).
+    """
+    source, order, position, frame = item
+    job = _recognizer.detect_stage(frame, _recognizer.new_stream())
+    _recognizer.identify_stage(job)
+    return source, order, position, [(t.label, t.confidence) for t in job.tracks]
+
+
+def read_frames(paths, out_queue, every=1, stop=None):
+    """
+    Reader thread: decodes video files and image folders into out_queue as
+    (source, order, position, frame). order counts frames per source; position
+    is seconds into a video or the file name. Puts None when done.
+    """
+    for path in paths:
+        order = 0
+        if stop is not None and stop.is_set():
+            break
+        if os.path.isdir(path):
+            for file_name in sorted(os.listdir(path)):
+                if not file_name.lower().endswith(IMAGE_EXTENSIONS):
+                    continue
+                frame = cv2.imread(os.path.join(path, file_name))
+                if frame is None:
+                    print(f"[WARNING] Could not load image: {file_name}")
+                    continue
+                out_queue.put((path, order, file_name, frame))
+                order += 1
+        else:
+            cap = cv2.VideoCapture(path)
+            if not cap.isOpened():
+                print(f"[WARNING] Could not open video: {path}")
+                continue
+            fps = cap.get(cv2.CAP_PROP_FPS) or 25.0
+            index = 0
+            while stop is None or not stop.is_set():
+                # grab() skips decoding of frames we do not sample
+                if not cap.grab():
+                    break
+                if index % every == 0:
+                    ok, frame = cap.retrieve()
+                    if ok:
+                        out_queue.put((path, order, round(index / fps, 2), frame))
+                        order += 1
+                index += 1
+            cap.release()
+    out_queue.put(None)
+
+
+def write_report(rows, output_path):
+    """Attendance summary: one row per (person, source)."""
+    os.makedirs(os.path.dirname(os.path.abspath(output_path)), exist_ok=True)
+    with open(output_path, mode="w", newline="", encoding="utf-8") as file:
+        writer = csv.writer(file)
+        writer.writerow(["Name", "Source", "First Seen", "Last Seen", "Frames", "Best Confidence", "Status"])
+        for (name, source), info in sorted(rows.items()):
+            writer.writerow([name, source, info["first"][1], info["last"][1], info["frames"],
+                             f"{info['best'] * 100:.0f}%", "Present"])
+
+
+def run_batch(paths, encodings_path, predictor_path, output_path, workers=None, every=1, index="exact",
+              min_confidence=0.5, detector="hog"):
+    workers = workers or os.cpu_count() or 1
+    frames_queue = queue.Queue(maxsize=workers * 4) # Bounded: the reader never runs far ahead
+    stop = threading.Event()
+    reader = threading.Thread(target=read_frames, args=(paths, frames_queue, every, stop), daemon=True)
+
+    seen = {}
+    frame_count = 0
+    face_count = 0
+
+    print(f"[INFO] Processing {len(paths)} inputs on {workers} worker processes...")
+    start = time.perf_counter()
+    reader.start()
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(encodings_path, predictor_path, index, detector)) as pool:
+        pending = set()
+        done_reading = False
+        broken = False
+
+        while (not done_reading or pending) and not broken:
+            try:
+                # Keep every worker busy, with a small bounded backlog
+                while not done_reading and len(pending) < workers * 2:
+                    item = frames_queue.get()
+                    if item is None:
+                        done_reading = True
+                        break
+                    pending.add(pool.submit(_recognize, item))
+            except BrokenProcessPool:
+                broken = True # A worker failed to start (e.g. models missing) or died
+                break
+
+            if not pending:
+                continue
+            finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+
+            for future in finished:
+                try:
+                    source, order, position, faces = future.result()
+                except BrokenProcessPool:
+                    broken = True
+                    continue
+                except Exception as e:
+                    print(f"[ERROR] Frame failed: {e}")
+                    continue
+
+                frame_count += 1
+                face_count += len(faces)
+                for label, confidence in faces:
+                    if label == "Unknown" or confidence < min_confidence:
+                        continue
+                    info = seen.setdefault((label, source), {"first": (order, position), "last": (order, position),
+                                                             "frames": 0, "best": 0.0})
+                    info["frames"] += 1
+                    info["best"] = max(info["best"], confidence)
+                    # Frames finish out of order
+                    info["first"] = min(info["first"], (order, position), key=lambda p: p[0])
+                    info["last"] = max(info["last"], (order, position), key=lambda p: p[0])
+
+                if frame_count % 100 == 0:
+                    elapsed = time.perf_counter() - start
+                    print(f"[PROGRESS] {frame_count} frames | {frame_count / elapsed:.1f} frames/s")
+
+        if broken:
+            print("[ERROR] Worker processes failed (could not start or crashed). "
+                  "Stopping; the report covers the frames finished so far.")
+
+    stop.set()
+    elapsed = time.perf_counter() - start
+
+    write_report(seen, output_path)
+    people = len({name for name, _ in seen})
+    print(f"\n[DONE] {people} people recognized. Report saved to {output_path}")
+    print(f"[STATS] {frame_count} frames, {face_count} faces in {elapsed:.1f}s | "
+          f"{frame_count / max(elapsed, 1e-9):.1f} frames/s | {face_count / max(elapsed, 1e-9):.1f} faces/s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Headless batch attendance from recorded videos and photo folders")
+    parser.add_argument("inputs", nargs="+", help="Video files and/or folders of images")
+    parser.add_argument("-e", "--encodings", default="models/encodings.bin", help="Path to encodings store")
+    parser.add_argument("-p", "--predictor", default="models/shape_predictor_68_face_landmarks.dat", help="Path to dlib predictor")
+    parser.add_argument("-o", "--output", default=None, help="Attendance CSV (default: attendance_records/<time>_batch_attendance.csv)")
+    parser.add_argument("-w", "--workers", type=int, default=None, help="Worker processes (default: all cores)")
+    parser.add_argument("--every", type=int, default=1, help="Process every Nth video frame")
+    parser.add_argument("-i", "--index", default="exact", choices=["exact", "ivf"], help="Gallery search index")
+    parser.add_argument("-d", "--detector", default="hog", choices=["hog", "haar", "hybrid"], help="Face detector backend")
+    args = parser.parse_args()
+
+    if not os.path.exists(args.predictor):
+        print(f"[ERROR] Predictor not found at: {args.predictor}")
+        return
+
+    output = args.output or os.path.join(
+        "attendance_records", f"{datetime.now().strftime('%d-%m-%Y_%H-%M-%S')}_batch_attendance.csv")
+    run_batch(args.inputs, args.encodings, args.predictor, output,
+              workers=args.workers, every=max(1, args.every), index=args.index, detector=args.detector)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""
+Recall / latency benchmark for the gallery indexes.
+
+Usage:
+    python -m benchmarks.index_benchmark --sizes 10000 50000 200000 --nprobe 1 4 8 16
+"""
+import argparse
+import time
+import numpy as np
+
+from src.recognizer.index import ExactIndex, IVFIndex
+from benchmarks.synthetic import synthetic_gallery, synthetic_probes
+
+
+def time_search(index, probes, k):
+    """Searches one probe at a time (as in live recognition). Returns (results, ms/query)."""
+    indices = []
+    start = time.perf_counter()
+    for i in range(len(probes)):
+        top, _ = index.search(probes[i:i + 1], k)
+        indices.append(top[0])
+    elapsed = time.perf_counter() - start
+    return np.array(indices), elapsed * 1000.0 / len(probes)
+
+
+def recall_at_k(approx, exact):
+    """Fraction of the exact top-k that the approximate search also returned."""
+    hits = sum(len(set(a) & set(e)) for a, e in zip(approx, exact))
+    return hits / exact.size
+
+
+def run(sizes, nprobes, nlist, queries, k):
+    rows = []
+    for size in sizes:
+        encodings, _ = synthetic_gallery(size)
+        probes, _ = synthetic_probes(encodings, queries)
+
+        exact = ExactIndex()
+        exact.build(encodings)
+        exact_top, exact_ms = time_search(exact, probes, k)
+        rows.append((size, "exact", "-", 0.0, 1.0, exact_ms))
+
+        start = time.perf_counter()
+        ivf = IVFIndex(nlist=nlist, min_size=0)
+        ivf.build(encodings)
+        build_s = time.perf_counter() - start
+
+        for nprobe in nprobes:
+            ivf.nprobe = nprobe
+            ivf_top, ivf_ms = time_search(ivf, probes, k)
+            rows.append((size, "ivf", nprobe, build_s, recall_at_k(ivf_top, exact_top), ivf_ms))
+
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Gallery index recall/latency benchmark")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 50000, 200000], help="Gallery sizes")
+    parser.add_argument("--nprobe", type=int, nargs="+", default=[1, 4, 8, 16], help="IVF cells scanned per query")
+    parser.add_argument("--nlist", type=int, default=None, help="IVF cell count (default 4*sqrt(N))")
+    parser.add_argument("--queries", type=int, default=500, help="Probe faces per gallery size")
+    parser.add_argument("-k", type=int, default=1, help="Neighbours per query")
+    args = parser.parse_args()
+
+    print(f"{'size':>8} {'index':>6} {'nprobe':>6} {'build s':>8} {'recall@' + str(args.k):>9} {'ms/query':>9}")
+    for size, kind, nprobe, build_s, recall, ms in run(args.sizes, args.nprobe, args.nlist, args.queries, args.k):
+        print(f"{size:>8} {kind:>6} {nprobe:>6} {build_s:>8.2f} {recall:>9.3f} {ms:>9.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,248 @@
+"""
+Camera-free benchmark for FaceRecognitionSystem.
+
+Builds test frames from the photos in known_faces_data (tiled to N faces per
+frame at several resolutions), pads the gallery with synthetic encodings and
+times recognize_frame end to end plus each stage on its own.
+
+Usage:
+    python -m benchmarks.recognition_benchmark --gallery 1000 10000 100000 --faces 1 2 4
+    python -m benchmarks.recognition_benchmark --detectors hog haar hybrid
+    python -m benchmarks.recognition_benchmark --compare benchmarks/results/old.json
+    python -m benchmarks.recognition_benchmark --check-threshold
+"""
+import argparse
+import json
+import math
+import os
+import platform
+import time
+from datetime import datetime
+
+import cv2
+import dlib
+import numpy as np
+
+from src.recognizer.face_recognition_system import FaceRecognitionSystem
+from src.recognizer.detectors import make_detector
+from benchmarks.synthetic import synthetic_gallery
+
+RESOLUTIONS = {"480p": (640, 480), "720p": (1280, 720), "1080p": (1920, 1080)}
+STAGES = ["resize", "detect", "encode", "match", "landmarks", "pose", "end_to_end"]
+
+
+def load_faces(dataset_path):
+    faces = []
+    for file_name in sorted(os.listdir(dataset_path)):
+        if file_name.lower().endswith(('.jpg', '.jpeg', '.png')):
+            image = cv2.imread(os.path.join(dataset_path, file_name))
+            if image is not None:
+                faces.append(image)
+    if not faces:
+        raise RuntimeError(f"No images found in {dataset_path}")
+    return faces
+
+
+def compose_frame(faces, count, size):
+    """Tiles `count` photos onto a grey canvas of size (w, h)."""
+    w, h = size
+    canvas = np.full((h, w, 3), 90, dtype=np.uint8)
+    cols = math.ceil(math.sqrt(count))
+    rows = math.ceil(count / cols)
+    tile_w, tile_h = w // cols, h // rows
+
+    for i in range(count):
+        photo = faces[i % len(faces)]
+        ph, pw = photo.shape[:2]
+        fit = min(tile_w / pw, tile_h / ph)
+        resized = cv2.resize(photo, (max(1, int(pw * fit)), max(1, int(ph * fit))))
+        r, c = divmod(i, cols)
+        y, x = r * tile_h, c * tile_w
+        canvas[y:y + resized.shape[0], x:x + resized.shape[1]] = resized
+    return canvas
+
+
+def summarize(samples):
+    ms = np.asarray(samples) * 1000.0
+    return {"mean_ms": float(ms.mean()), "p50_ms": float(np.percentile(ms, 50)),
+            "p95_ms": float(np.percentile(ms, 95)), "runs": len(ms)}
+
+
+def time_stages(recognizer, frame, repeats):
+    """
+    Times each stage the same way recognize_frame chains them, plus the whole
+    call. Every run uses fresh tracking state so detection and encoding always run.
+    """
+    timings = {stage: [] for stage in STAGES}
+    scale = recognizer.detection_scale
+    h, w = frame.shape[:2]
+
+    for _ in range(repeats):
+        t0 = time.perf_counter()
+        small = cv2.resize(frame, (0, 0), fx=scale, fy=scale)
+        rgb_small = cv2.cvtColor(small, cv2.COLOR_BGR2RGB)
+        t1 = time.perf_counter()
+        locations = recognizer.face_detector.detect(rgb_small)
+        boxes = [(int(top / scale), int(right / scale), int(bottom / scale), int(left / scale))
+                 for (top, right, bottom, left) in locations]
+        t2 = time.perf_counter()
+
+        # Shared landmark pass (ROI grayscale + 68 points), then encoding from the same landmarks
+        coords = [recognizer._face_landmarks(frame, box)[0] for box in boxes]
+        t3 = time.perf_counter()
+        encodings = [recognizer._face_landmarks(frame, box, encode=True)[1] for box in boxes]
+        t4 = time.perf_counter()
+        recognizer.gallery.match(encodings, k=recognizer.TOP_K)
+        t5 = time.perf_counter()
+        if coords:
+            recognizer.pose_estimator.estimate(np.stack(coords), h, w) # Cold start, no previous pose
+        t6 = time.perf_counter()
+
+        recognizer.recognize_frame(frame, stream=recognizer.new_stream())
+        t7 = time.perf_counter()
+
+        # The encode timing includes a second landmark pass; report the encoder alone
+        landmarks_dt = t3 - t2
+        for stage, dt in zip(STAGES, (t1 - t0, t2 - t1, max(0.0, t4 - t3 - landmarks_dt), t5 - t4,
+                                      landmarks_dt, t6 - t5, t7 - t6)):
+            timings[stage].append(dt)
+
+    return {stage: summarize(samples) for stage, samples in timings.items()}, len(locations)
+
+
+def run(args):
+    recognizer = FaceRecognitionSystem(model_path=args.encodings, predictor_path=args.predictor, index=args.index)
+    real_encodings = np.asarray(recognizer.gallery.encodings, dtype=np.float32)
+    real_labels = list(recognizer.gallery.labels)
+    faces = load_faces(args.dataset)
+    detectors = {kind: make_detector(kind) for kind in args.detectors}
+
+    results = []
+    for gallery_size in args.gallery:
+        # Real enrolments first, padded with synthetic identities up to the requested size
+        extra = max(0, gallery_size - len(real_labels))
+        synth, synth_labels = synthetic_gallery(extra)
+        recognizer.gallery.set(np.concatenate([real_encodings.reshape(-1, 128), synth]), real_labels + synth_labels)
+
+        for detector, backend in detectors.items():
+            recognizer.face_detector = backend
+            for resolution in args.resolutions:
+                for count in args.faces:
+                    frame = compose_frame(faces, count, RESOLUTIONS[resolution])
+                    recognizer.recognize_frame(frame, stream=recognizer.new_stream()) # Warm-up
+                    stages, detected = time_stages(recognizer, frame, args.repeats)
+                    row = {"gallery": len(recognizer.gallery), "detector": detector, "resolution": resolution,
+                           "faces": count, "detected": detected, "stages": stages}
+                    results.append(row)
+                    print(f"[BENCH] gallery={row['gallery']:>6} {detector:>6} {resolution:>5} faces={count} "
+                          f"(found {detected}) | " + " | ".join(f"{s} {stages[s]['mean_ms']:.1f}ms" for s in STAGES))
+
+    return {
+        "meta": {
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "numpy": np.__version__,
+            "opencv": cv2.__version__,
+            "dlib": getattr(dlib, "__version__", "unknown"),
+            "index": args.index,
+            "repeats": args.repeats,
+        },
+        "results": results,
+    }
+
+
+def check_threshold(recognizer, dataset_path):
+    """
+    Encodes every dataset photo through the probe path (detector + shared
+    landmark pass) and prints its distance to its own enrolment and to the
+    nearest other person, to check MATCH_THRESHOLD against the gallery.
+    """
+    encodings = np.asarray(recognizer.gallery.encodings, dtype=np.float32)
+    labels = np.asarray(recognizer.gallery.labels)
+    genuine, impostor = [], []
+
+    for file_name in sorted(os.listdir(dataset_path)):
+        if not file_name.lower().endswith(('.jpg', '.jpeg', '.png')):
+            continue
+        label = os.path.splitext(file_name)[0]
+        frame = cv2.imread(os.path.join(dataset_path, file_name))
+        if frame is None or label not in labels:
+            continue
+        boxes = recognizer.face_detector.detect(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB))
+        if len(boxes) != 1:
+            continue
+
+        _, encoding = recognizer._face_landmarks(frame, boxes[0], encode=True)
+        distances = np.linalg.norm(encodings - encoding.astype(np.float32), axis=1)
+        own = float(distances[labels == label].min())
+        other = float(distances[labels != label].min()) if (labels != label).any() else float("nan")
+        genuine.append(own)
+        impostor.append(other)
+        print(f"[THRESHOLD] {label:<24} own {own:.3f} | nearest other {other:.3f}")
+
+    if genuine:
+        threshold = recognizer.MATCH_THRESHOLD
+        print(f"[THRESHOLD] max own distance {max(genuine):.3f}, min other distance {np.nanmin(impostor):.3f}, "
+              f"threshold {threshold} -> {'OK' if max(genuine) < threshold <= np.nanmin(impostor) else 'CHECK'}")
+
+
+def compare(current, baseline_path):
+    """Prints mean-latency change per stage against an earlier result file."""
+    with open(baseline_path, "r", encoding="utf-8") as f:
+        baseline = json.load(f)
+    key = lambda r: (r["gallery"], r.get("detector", "hog"), r["resolution"], r["faces"])
+    old = {key(r): r for r in baseline["results"]}
+
+    print(f"\n[COMPARE] against {baseline_path} ({baseline['meta'].get('timestamp')})")
+    for row in current["results"]:
+        before = old.get(key(row))
+        if before is None:
+            continue
+        deltas = []
+        for stage in STAGES:
+            a, b = before["stages"][stage]["mean_ms"], row["stages"][stage]["mean_ms"]
+            change = (b - a) / a * 100.0 if a > 0 else 0.0
+            deltas.append(f"{stage} {change:+.0f}%")
+        print(f"  gallery={row['gallery']} {row['detector']} {row['resolution']} faces={row['faces']}: "
+              + " | ".join(deltas))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Camera-free recognition benchmark")
+    parser.add_argument("-e", "--encodings", default="models/encodings.bin", help="Path to encodings store")
+    parser.add_argument("-p", "--predictor", default="models/shape_predictor_68_face_landmarks.dat", help="Path to dlib predictor")
+    parser.add_argument("-d", "--dataset", default="known_faces_data", help="Folder of face photos used to build frames")
+    parser.add_argument("--gallery", type=int, nargs="+", default=[1000, 10000, 100000], help="Gallery sizes")
+    parser.add_argument("--faces", type=int, nargs="+", default=[1, 2, 4], help="Faces per frame")
+    parser.add_argument("--resolutions", nargs="+", default=["480p", "720p"], choices=list(RESOLUTIONS))
+    parser.add_argument("--repeats", type=int, default=10, help="Timed runs per configuration")
+    parser.add_argument("-i", "--index", default="exact", choices=["exact", "ivf"], help="Gallery search index")
+    parser.add_argument("--detectors", nargs="+", default=["hog"], choices=["hog", "haar", "hybrid"],
+                        help="Detector backends to compare")
+    parser.add_argument("-o", "--output", default=None, help="JSON output (default: benchmarks/results/<time>.json)")
+    parser.add_argument("--compare", default=None, help="Earlier JSON result to compare against")
+    parser.add_argument("--check-threshold", action="store_true",
+                        help="Only report probe-to-gallery distances of the dataset photos")
+    args = parser.parse_args()
+
+    if args.check_threshold:
+        recognizer = FaceRecognitionSystem(model_path=args.encodings, predictor_path=args.predictor)
+        check_threshold(recognizer, args.dataset)
+        return
+
+    report = run(args)
+
+    output = args.output or os.path.join("benchmarks", "results", f"{datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"\n[DONE] Results saved to {output}")
+
+    if args.compare:
+        compare(report, args.compare)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,22 @@
+import numpy as np
+
+# Rough statistics of dlib 128-d encodings: different people sit ~0.9 apart,
+# photos of the same person ~0.35 apart.
+IDENTITY_STD = 0.9 / np.sqrt(2 * 128)
+PROBE_NOISE_STD = 0.35 / np.sqrt(128)
+
+
+def synthetic_gallery(size, seed=0):
+    """Random (size, 128) float32 gallery with labels 'person_<i>'."""
+    rng = np.random.default_rng(seed)
+    encodings = rng.normal(0.0, IDENTITY_STD, size=(size, 128)).astype(np.float32)
+    labels = [f"person_{i}" for i in range(size)]
+    return encodings, labels
+
+
+def synthetic_probes(encodings, count, seed=1):
+    """Noisy re-captures of random enrolled faces. Returns (probes, true_indices)."""
+    rng = np.random.default_rng(seed)
+    truth = rng.integers(0, len(encodings), size=count)
+    noise = rng.normal(0.0, PROBE_NOISE_STD, size=(count, encodings.shape[1]))
+    return (encodings[truth] + noise).astype(np.float32), truth
@@ -1,63 +1,222 @@
-import face_recognition
-import pickle
+import dlib
+from functools import partial
+import argparse
+import hashlib
+import json
 import os
+import time
 import cv2
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from src.recognizer.encodings_store import EncodingStore
+from src.recognizer.detectors import make_detector
+from src.recognizer.face_recognition_system import encode_face
 
-def force_encode():
-    # 1. Setup paths
-    dataset_path = "known_faces_data"
-    encodings_path = "models/encodings.pkl"
-    
-    known_encodings = []
-    known_names = []
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png')
+PREDICTOR_PATH = "models/shape_predictor_68_face_landmarks.dat"
+CACHE_VERSION = 2 # 2: encodings aligned with the 68-point landmarks, like the recognizer's probes
+
+# One detector / landmark predictor per worker process, created on first use
+_detectors = {}
+_predictors = {}
+
+
+def file_sha1(path, chunk_size=1 << 20):
+    """Content hash used to skip images that were already encoded."""
+    digest = hashlib.sha1()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def encode_image(image_path, detector="hog", predictor_path=PREDICTOR_PATH):
+    """
+    Worker: detects and encodes the single face in one image.
+    Returns (status, encoding or None, message). Runs in a separate process.
+    """
+    file_name = os.path.basename(image_path)
+
+    # 3. Load image
+    image = cv2.imread(image_path)
+    if image is None:
+        return "unreadable", None, f"  [ERROR] Could not load image: {file_name}"
+
+    rgb = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
+
+    # 4. Detect faces
+    if detector not in _detectors:
+        _detectors[detector] = make_detector(detector)
+    boxes = _detectors[detector].detect(rgb)
+
+    if len(boxes) == 0:
+        return "no_face", None, f"  [WARNING] NO FACE FOUND in {file_name}. Use a clearer photo."
+
+    if len(boxes) > 1:
+        return "multiple_faces", None, f"  [WARNING] Multiple faces found in {file_name}. Use a photo with only YOU."
+
+    # 5. Encode (same 68-point alignment as recognition)
+    if predictor_path not in _predictors:
+        _predictors[predictor_path] = dlib.shape_predictor(predictor_path)
+    encoding = encode_face(_predictors[predictor_path], rgb, boxes[0])
+
+    return "ok", np.asarray(encoding, dtype=np.float32), f"  [SUCCESS] Encoded {os.path.splitext(file_name)[0]}."
+
+
+def load_cache(cache_path):
+    if not os.path.exists(cache_path):
+        return {}
+    try:
+        with open(cache_path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        if data.get("version") != CACHE_VERSION:
+            return {}
+        return data.get("files", {})
+    except (OSError, ValueError) as e:
+        print(f"[WARNING] Ignoring unreadable cache {cache_path}: {e}")
+        return {}
+
+
+def save_cache(cache_path, files):
+    tmp_path = cache_path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump({"version": CACHE_VERSION, "files": files}, f, indent=1)
+    os.replace(tmp_path, cache_path)
+
+
+def force_encode(dataset_path="known_faces_data", encodings_path="models/encodings.bin",
+                 cache_path=None, workers=None, full=False, detector="hog", predictor_path=PREDICTOR_PATH):
+    """
+    Enrols every image in dataset_path. Only new or changed images (by content
+    hash) are encoded; the work is spread over a process pool.
+    New images are appended to the store; changed or removed ones rewrite it,
+    which on Windows fails while a recognizer has the store open.
+    """
+    workers = workers or os.cpu_count() or 1
+    if not os.path.exists(predictor_path):
+        raise FileNotFoundError(f"Missing dlib predictor: {predictor_path} (run setup_project.py)")
+    cache_path = cache_path or os.path.splitext(encodings_path)[0] + "_cache.json"
+    store = EncodingStore(encodings_path)
 
     print(f"[DEBUG] Looking for images in: {os.path.abspath(dataset_path)}")
 
-    # 2. Loop over the images in the folder
-    for file_name in os.listdir(dataset_path):
+    # 1. Hash the dataset and compare with the cache
+    cache = {} if full else load_cache(cache_path)
+    stored_rows = len(store)
+    cached_rows = sorted(entry["row"] for entry in cache.values() if entry.get("row") is not None)
+    if cached_rows != list(range(stored_rows)):
+        if cache:
+            print("[WARNING] Cache does not match the encodings store. Re-encoding everything.")
+        cache = {}
+
+    current = {}
+    pending = []
+    for file_name in sorted(os.listdir(dataset_path)):
         # Skip non-image files
-        if not file_name.lower().endswith(('.jpg', '.jpeg', '.png')):
+        if not file_name.lower().endswith(IMAGE_EXTENSIONS):
             continue
 
-        image_path = os.path.join(dataset_path, file_name)
-        name = os.path.splitext(file_name)[0]  # Extracts "Mhmad_hassn" from filename
-        print(f"[PROCESSING] {name} ({file_name})...")
+        sha1 = file_sha1(os.path.join(dataset_path, file_name))
+        entry = cache.get(file_name)
+        if entry and entry.get("sha1") == sha1:
+            current[file_name] = entry
+        else:
+            current[file_name] = {"sha1": sha1, "label": os.path.splitext(file_name)[0], "row": None}
+            pending.append(file_name)
 
-        # 3. Load image
-        image = cv2.imread(image_path)
-        if image is None:
-            print(f"  [ERROR] Could not load image: {file_name}")
-            continue
+    removed = [name for name in cache if name not in current]
+    changed = [name for name in pending if name in cache]
+    print(f"[INFO] {len(current)} images: {len(current) - len(pending)} cached, "
+          f"{len(pending) - len(changed)} new, {len(changed)} changed, {len(removed)} removed.")
 
-        rgb = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
+    # 2. Encode pending images in parallel
+    new_encodings = {}
+    start = time.perf_counter()
+    if pending:
+        print(f"[INFO] Encoding {len(pending)} images on {workers} worker processes...")
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            encode = partial(encode_image, detector=detector, predictor_path=predictor_path)
+            futures = {pool.submit(encode, os.path.join(dataset_path, name)): name for name in pending}
+            for done, future in enumerate(as_completed(futures), start=1):
+                file_name = futures[future]
+                try:
+                    status, encoding, message = future.result()
+                except Exception as e:
+                    status, encoding, message = "error", None, f"  [ERROR] {file_name}: {e}"
 
-        # 4. Detect faces
-        boxes = face_recognition.face_locations(rgb, model="hog")
-        
-        if len(boxes) == 0:
-            print(f"  [WARNING] NO FACE FOUND in {file_name}. Use a clearer photo.")
-            continue
-        
-        if len(boxes) > 1:
-            print(f"  [WARNING] Multiple faces found in {file_name}. Use a photo with only YOU.")
-            continue
+                print(f"[PROCESSING] {file_name}\n{message}")
+                current[file_name]["status"] = status
+                if encoding is not None:
+                    new_encodings[file_name] = encoding
 
-        # 5. Encode
-        encodings = face_recognition.face_encodings(rgb, boxes)
-        
-        if len(encodings) > 0:
-            known_encodings.append(encodings[0])
-            known_names.append(name)
-            print(f"  [SUCCESS] Encoded {name}.")
-
-    # 6. Save to pickle
-    if len(known_encodings) > 0:
-        data = {"encodings": known_encodings, "names": known_names}
-        with open(encodings_path, "wb") as f:
-            f.write(pickle.dumps(data))
-        print(f"\n[DONE] Saved {len(known_encodings)} encodings to {encodings_path}")
+                if done % 25 == 0 or done == len(pending):
+                    elapsed = time.perf_counter() - start
+                    rate = done / elapsed if elapsed > 0 else 0.0
+                    eta = (len(pending) - done) / rate if rate > 0 else 0.0
+                    print(f"[PROGRESS] {done}/{len(pending)} images | {rate:.1f} img/s | ETA {eta:.0f}s")
+
+    # 3. Update the store: append if only new images, otherwise rewrite
+    if cache and not (changed or removed):
+        if new_encodings:
+            names = [name for name in pending if name in new_encodings]
+            store.append([new_encodings[n] for n in names], [current[n]["label"] for n in names])
+            for row, name in enumerate(names, start=stored_rows):
+                current[name]["row"] = row
+    else:
+        kept = [name for name, entry in current.items()
+                if name not in new_encodings and entry.get("row") is not None]
+        old_rows = {}
+        if kept:
+            # Copy the kept rows into RAM and release the mapping before write():
+            # Windows cannot replace a file that is still mapped. For the same
+            # reason, stop running recognizers (they keep the store mapped) first.
+            old_matrix, _ = store.load()
+            kept_rows = np.array(old_matrix[[current[name]["row"] for name in kept]])
+            del old_matrix
+            old_rows = dict(zip(kept, kept_rows))
+
+        encodings, labels = [], []
+        for name, entry in current.items():
+            encoding = new_encodings.get(name)
+            if encoding is None:
+                encoding = old_rows.get(name)
+            if encoding is None:
+                continue
+            entry["row"] = len(encodings)
+            encodings.append(encoding)
+            labels.append(entry["label"])
+
+        if not encodings and stored_rows and not full:
+            # Nothing encoded (failed images, empty or wrong folder): never wipe a working gallery
+            print(f"[WARNING] No images could be encoded; keeping the {stored_rows} existing encodings "
+                  f"in {encodings_path}. Use --full to replace them anyway.")
+            return
+        store.write(encodings, labels)
+
+    save_cache(cache_path, current)
+
+    # 4. Report
+    elapsed = time.perf_counter() - start
+    total = len(store)
+    if pending:
+        print(f"\n[STATS] Encoded {len(new_encodings)}/{len(pending)} images in {elapsed:.1f}s "
+              f"({len(pending) / max(elapsed, 1e-9):.1f} img/s, {workers} workers)")
+
+    if total > 0:
+        print(f"[DONE] {total} encodings in {encodings_path}")
     else:
         print("\n[FAIL] No encodings were saved. Check your images.")
 
+
 if __name__ == "__main__":
-    force_encode()
+    parser = argparse.ArgumentParser(description="Enrol known faces into the encodings store")
+    parser.add_argument("-d", "--dataset", default="known_faces_data", help="Folder of <name>.jpg photos")
+    parser.add_argument("-e", "--encodings", default="models/encodings.bin", help="Encodings store path")
+    parser.add_argument("-w", "--workers", type=int, default=None, help="Worker processes (default: all cores)")
+    parser.add_argument("--full", action="store_true", help="Ignore the cache and re-encode every image")
+    parser.add_argument("--detector", default="hog", choices=["hog", "haar", "hybrid"], help="Face detector backend")
+    parser.add_argument("-p", "--predictor", default=PREDICTOR_PATH, help="Path to dlib 68-point predictor")
+    args = parser.parse_args()
+
+    force_encode(args.dataset, args.encodings, workers=args.workers, full=args.full, detector=args.detector,
+                 predictor_path=args.predictor)
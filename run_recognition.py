@@ -1,51 +1,37 @@
 import cv2
 import argparse
 import time
-import threading
 import sys
 import os
 from src.recognizer.face_recognition_system import FaceRecognitionSystem
+from src.recognizer.autotune import AutoTuner
+from src.pipeline import build_recognition_pipeline
+from src.capture import VideoStream, CameraPool, MotionGate, parse_source
+from src.utils.tracing import StageTracer
 
-class VideoStream:
-    """
-    Threaded video stream reader to prevent I/O blocking.
-    This increases FPS by overlapping frame capture with processing.
-    """
-    def __init__(self, src=0):
-        self.stream = cv2.VideoCapture(src, cv2.CAP_DSHOW) # CAP_DSHOW for faster startup on Windows
-        if not self.stream.isOpened():
-             self.stream = cv2.VideoCapture(src)
-             
-        self.grabbed, self.frame = self.stream.read()
-        self.stopped = False
-
-    def start(self):
-        threading.Thread(target=self.update, args=(), daemon=True).start()
-        return self
-
-    def update(self):
-        while not self.stopped:
-            if not self.grabbed:
-                self.stop()
-            else:
-                (self.grabbed, self.frame) = self.stream.read()
-
-    def read(self):
-        return self.frame
-
-    def stop(self):
-        self.stopped = True
-        self.stream.release()
-
-def draw_hud(frame, results, fps):
+def draw_hud(frame, results, fps, stage_stats=None, trace_stats=None):
     """
     Draws the Heads-Up Display (HUD) with debug info.
+    stage_stats: optional Pipeline.stats() list, shown under the FPS counter.
+    trace_stats: optional StageTracer.stats() dict, per-stage ms shown next to FPS.
     """
     h, w = frame.shape[:2]
     
     # Draw FPS
     cv2.putText(frame, f"FPS: {fps:.1f}", (w - 120, 30), 
                 cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 0), 2)
+
+    # Pipeline stages: latency, queue depth and dropped items
+    for i, st in enumerate(stage_stats or []):
+        line = f"{st['name']}: {st['avg_ms']:.1f}ms q{st['queue']} d{st['dropped']}"
+        cv2.putText(frame, line, (w - 230, 55 + i * 18),
+                    cv2.FONT_HERSHEY_SIMPLEX, 0.45, (0, 255, 0), 1)
+
+    # Traced stages: rolling average / p95 per stage
+    for i, (name, st) in enumerate(sorted((trace_stats or {}).items())):
+        line = f"{name}: {st['avg_ms']:.1f}ms (p95 {st['p95_ms']:.1f})"
+        cv2.putText(frame, line, (w - 460, 55 + i * 18),
+                    cv2.FONT_HERSHEY_SIMPLEX, 0.45, (255, 255, 0), 1)
     
     # Instructions
     cv2.putText(frame, "'Q' to Quit", (10, 30), cv2.FONT_HERSHEY_SIMPLEX, 0.6, (200, 200, 200), 1)
@@ -99,12 +85,67 @@ def draw_hud(frame, results, fps):
 
     return frame
 
+def run_multi_camera(recognizer, sources, workers):
+    """
+    Several cameras, one recognizer, a shared pool of worker threads.
+    Each camera gets its own window; per-camera FPS/latency is printed every few seconds.
+    """
+    print(f"[INFO] Starting {len(sources)} cameras on {workers} recognition workers...")
+    pool = CameraPool(recognizer, sources, workers=workers).start()
+    shown = {}
+    last_report = time.time()
+
+    print("[INFO] System Ready. Press 'Q' to exit.")
+    try:
+        while pool.active:
+            for camera in pool.cameras:
+                latest = camera.latest
+                if latest is None or shown.get(camera.name) is latest:
+                    continue
+                shown[camera.name] = latest
+                frame, results = latest
+                cv2.imshow(f"Recognition View - {camera.name}", draw_hud(frame, results, camera.fps))
+
+            if time.time() - last_report >= 5.0:
+                last_report = time.time()
+                for st in pool.stats():
+                    print(f"[STATS] {st['name']}: {st['fps']:.1f} FPS | {st['latency_ms']:.0f} ms | "
+                          f"dropped {st['dropped']}/{st['captured']}")
+
+            key = cv2.waitKey(1) & 0xFF
+            if key == ord("q"):
+                break
+    except KeyboardInterrupt:
+        print("[INFO] Stopping...")
+    finally:
+        pool.stop()
+        cv2.destroyAllWindows()
+        for st in pool.stats():
+            print(f"[STATS] {st['name']}: processed {st['processed']} of {st['captured']} frames, "
+                  f"{st['latency_ms']:.0f} ms avg")
+        print("[INFO] Clean exit.")
+
 def main():
     # Setup Argument Parser
     parser = argparse.ArgumentParser(description="Smart Attendance Recognition Runner")
-    parser.add_argument("-e", "--encodings", default="models/encodings.pkl", help="Path to encodings.pkl")
+    parser.add_argument("-e", "--encodings", default="models/encodings.bin", help="Path to encodings store (.bin) or legacy .pkl")
     parser.add_argument("-p", "--predictor", default="models/shape_predictor_68_face_landmarks.dat", help="Path to dlib predictor")
-    parser.add_argument("-c", "--camera", type=int, default=0, help="Camera Source ID")
+    parser.add_argument("-c", "--camera", nargs="+", default=["0"],
+                        help="Camera sources: device index, video file or stream URL (several = multi-camera)")
+    parser.add_argument("-w", "--workers", type=int, default=None, help="Recognition worker threads for multi-camera mode")
+    parser.add_argument("-n", "--detect-every", type=int, default=1, help="Full face detection every N frames, tracking in between")
+    parser.add_argument("-s", "--scale", type=float, default=None,
+                        help="Detection downscale (default 0.25; higher finds smaller faces, lower is faster)")
+    parser.add_argument("--target-fps", type=float, default=None,
+                        help="Auto-tune detection scale, detection interval and liveness frequency toward this FPS")
+    parser.add_argument("--motion-gate", action="store_true",
+                        help="Skip recognition while the scene is static (periodic refresh still runs)")
+    parser.add_argument("-d", "--detector", default="hog", choices=["hog", "haar", "hybrid"],
+                        help="Face detector: dlib HOG, OpenCV Haar cascade (fast) or cascade + HOG confirmation")
+    parser.add_argument("-i", "--index", default="exact", choices=["exact", "ivf"], help="Gallery search index")
+    parser.add_argument("--pipeline", action="store_true", help="Run capture/detect/identify/liveness as threaded stages")
+    parser.add_argument("--trace", nargs="?", const="traces/recognition_trace.json", default=None,
+                        help="Time every stage, show it on the HUD and save a Chrome/Perfetto trace on exit")
     args = parser.parse_args()
 
     # Verify Paths before starting
@@ -116,32 +157,89 @@ def main():
     # Initialize Engine
     print("[INFO] Initializing Recognition Engine...")
     try:
-        recognizer = FaceRecognitionSystem(model_path=args.encodings, predictor_path=args.predictor)
+        tracer = StageTracer(enabled=args.trace is not None)
+        recognizer = FaceRecognitionSystem(model_path=args.encodings, predictor_path=args.predictor, index=args.index,
+                                           detect_interval=args.detect_every, tracer=tracer,
+                                           detection_scale=args.scale, detector=args.detector)
     except Exception as e:
         print(f"[CRITICAL ERROR] Could not start engine: {e}")
         return
 
+    sources = [parse_source(src) for src in args.camera]
+    if len(sources) > 1:
+        run_multi_camera(recognizer, sources, args.workers or min(len(sources), os.cpu_count() or 1))
+        if tracer.enabled:
+            tracer.export_chrome_trace(args.trace)
+        return
+
     # Initialize Threaded Video
-    print(f"[INFO] Starting Video Stream on Camera {args.camera}...")
-    vs = VideoStream(src=args.camera).start()
+    print(f"[INFO] Starting Video Stream on Camera {sources[0]}...")
+    vs = VideoStream(src=sources[0]).start()
     time.sleep(1.0) # Warmup
 
     fps_start = time.time()
     frame_count = 0
     fps = 0
 
+    last_seq = 0
+
+    def next_frame():
+        """Each captured frame is handed out at most once."""
+        nonlocal last_seq
+        last_seq, frame = vs.read_next(last_seq, timeout=0.5)
+        return frame
+
+    # Optional staged pipeline; rendering stays on the main thread (imshow requirement)
+    pipeline = build_recognition_pipeline(recognizer, next_frame).start() if args.pipeline else None
+
+    tuner = None
+    if args.target_fps:
+        if pipeline:
+            print("[WARNING] --target-fps is not supported with --pipeline. Ignoring.")
+        else:
+            tuner = AutoTuner(recognizer, args.target_fps)
+            print(f"[INFO] Auto-tuning toward {args.target_fps:.0f} FPS, starting at {tuner.report()}")
+
+    gate = None
+    if args.motion_gate:
+        if pipeline:
+            print("[WARNING] --motion-gate is not supported with --pipeline. Ignoring.")
+        else:
+            gate = MotionGate()
+    results = []
+    render_ms = 0.0
+
     print("[INFO] System Ready. Press 'Q' to exit.")
 
     try:
         while True:
-            frame = vs.read()
-            if frame is None:
-                print("[INFO] No frame received. Exiting...")
-                break
+            if pipeline:
+                job = pipeline.output.get(timeout=1.0)
+                if job is None:
+                    if vs.stopped:
+                        print("[INFO] No frame received. Exiting...")
+                        break
+                    continue
+                frame, results = job.frame, job.results
+            else:
+                frame = next_frame()
+                if frame is None:
+                    if vs.stopped:
+                        print("[INFO] No frame received. Exiting...")
+                        break
+                    continue
 
-            # --- CORE PROCESS ---
-            results = recognizer.recognize_frame(frame)
-            # --------------------
+                # --- CORE PROCESS ---
+                # Static scene: keep showing the last results and skip recognition
+                if gate is None or gate.check(frame, faces_present=bool(results)):
+                    start = time.perf_counter()
+                    results = recognizer.recognize_frame(frame)
+                    elapsed = time.perf_counter() - start
+                    if tuner:
+                        tuner.update(elapsed)
+                    if gate:
+                        gate.record(elapsed)
+                # --------------------
 
             # FPS Calculation
             frame_count += 1
@@ -151,18 +249,39 @@ def main():
                 fps_start = fps_end
 
             # Visualization
-            output_frame = draw_hud(frame, results, fps)
+            render_start = time.perf_counter()
+            stage_stats = None
+            if pipeline:
+                stage_stats = pipeline.stats()
+                stage_stats.append({"name": "render", "avg_ms": render_ms, "queue": len(pipeline.output), "dropped": 0})
+            output_frame = draw_hud(frame, results, fps, stage_stats, tracer.stats() if tracer.enabled else None)
             cv2.imshow("Recognition View", output_frame)
 
             key = cv2.waitKey(1) & 0xFF
+            render_ms = 0.9 * render_ms + 0.1 * (time.perf_counter() - render_start) * 1000.0
             if key == ord("q"):
                 break
 
     except KeyboardInterrupt:
         print("[INFO] Stopping...")
     finally:
+        if pipeline:
+            pipeline.stop()
         vs.stop()
         cv2.destroyAllWindows()
+        if tuner:
+            print(f"[TUNE] Final settings: {tuner.report()} ({len(tuner.history)} adjustments)")
+        if args.trace:
+            count = tracer.export_chrome_trace(args.trace)
+            print(f"[INFO] Saved {count} trace events to {args.trace} (open in ui.perfetto.dev)")
+        if gate:
+            st = gate.stats()
+            print(f"[STATS] Motion gate: processed {st['processed']}/{st['frames']} frames "
+                  f"({st['duty_cycle'] * 100:.0f}% duty cycle, {st['gate_ms']:.2f} ms/check) | "
+                  f"~{st['saved_seconds']:.1f}s of recognition saved")
+        ring = vs.ring.stats()
+        print(f"[STATS] Frames captured: {ring['captured']} | processed: {ring['delivered']} | "
+              f"dropped: {ring['dropped']}")
         print("[INFO] Clean exit.")
 
 if __name__ == "__main__":
@@ -0,0 +1,4 @@
+from .frame_ring import FrameRing
+from .video_stream import VideoStream, parse_source, open_capture
+from .multi_camera import CameraPool
+from .motion_gate import MotionGate
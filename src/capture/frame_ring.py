@@ -0,0 +1,83 @@
+import threading
+import numpy as np
+
+
+class FrameRing:
+    """
+    Ring of preallocated frame slots with monotonically increasing sequence numbers.
+
+    Single writer (the capture thread), any number of readers. The writer never
+    waits for readers: it fills the next slot and publishes it by bumping the
+    sequence number. Readers ask for the first frame newer than the one they
+    already have, so each frame is handed to a consumer at most once.
+
+    Frames returned with copy=False are views into a slot and stay valid until
+    the writer wraps around (slots - 1 more frames). Consumers that keep a
+    frame longer than that should ask for a copy.
+    """
+
+    def __init__(self, slots=8):
+        if slots < 2:
+            raise ValueError("FrameRing needs at least 2 slots")
+        self.slots = slots
+        self._buffers = None
+        self.seq = 0            # Sequence number of the newest published frame (0 = none yet)
+        self.dropped = 0        # Frames skipped by readers that fell behind
+        self.delivered = 0
+        self._cond = threading.Condition()
+
+    # --- WRITER ---
+    def write_slot(self):
+        """Buffer the next frame should be captured into (None until the frame size is known)."""
+        if self._buffers is None:
+            return None
+        return self._buffers[(self.seq + 1) % self.slots]
+
+    def commit(self, frame):
+        """
+        Publishes the next frame. Pass the array returned by write_slot() after
+        filling it in place; any other array is copied into the slot.
+        """
+        index = (self.seq + 1) % self.slots
+        if self._buffers is None or self._buffers[index].shape != frame.shape or self._buffers[index].dtype != frame.dtype:
+            self._buffers = [np.empty_like(frame) for _ in range(self.slots)]
+        if frame is not self._buffers[index]:
+            np.copyto(self._buffers[index], frame)
+
+        with self._cond:
+            self.seq += 1
+            self._cond.notify_all()
+
+    # --- READERS ---
+    def read_next(self, after_seq=0, timeout=None, copy=False):
+        """
+        Blocks until a frame newer than after_seq is available.
+        Returns (seq, frame), or (after_seq, None) on timeout.
+        If the reader fell behind, it jumps to the newest frame and the
+        skipped frames are counted in self.dropped.
+        """
+        with self._cond:
+            if not self._cond.wait_for(lambda: self.seq > after_seq, timeout=timeout):
+                return after_seq, None
+            seq = self.seq
+            frame = self._buffers[seq % self.slots]
+
+        if after_seq and seq > after_seq + 1:
+            self.dropped += seq - after_seq - 1
+        self.delivered += 1
+        return seq, (frame.copy() if copy else frame)
+
+    def latest(self, copy=True):
+        """Newest frame without waiting (None before the first frame)."""
+        if self.seq == 0:
+            return None
+        frame = self._buffers[self.seq % self.slots]
+        return frame.copy() if copy else frame
+
+    def wake(self):
+        """Wakes blocked readers (e.g. on shutdown)."""
+        with self._cond:
+            self._cond.notify_all()
+
+    def stats(self):
+        return {"captured": self.seq, "delivered": self.delivered, "dropped": self.dropped}
@@ -0,0 +1,94 @@
+import time
+import cv2
+import numpy as np
+
+
+class MotionGate:
+    """
+    Cheap scene-change check in front of recognize_frame().
+
+    Each frame is shrunk to a tiny blurred grayscale thumbnail and compared
+    with the thumbnail of the last frame that went through recognition. The
+    expensive stages only run when enough of the thumbnail changed, while
+    faces are in view (blinks and small head turns barely move pixels, but
+    tracking and liveness need consecutive frames), for a short hold time
+    after the last change, or when a periodic refresh is due.
+
+    stats() reports the duty cycle (share of frames that were processed) and,
+    when processing times are recorded, an estimate of the time saved.
+    """
+
+    def __init__(self, width=64, pixel_threshold=18, area_threshold=0.01, hold=1.0, refresh=5.0,
+                 clock=time.monotonic):
+        self.width = width                      # Thumbnail width (height keeps the aspect ratio)
+        self.pixel_threshold = pixel_threshold  # Grey-level change that counts as a changed pixel
+        self.area_threshold = area_threshold    # Fraction of changed pixels that counts as motion
+        self.hold = hold                        # Seconds to keep processing after the last motion
+        self.refresh = refresh                  # Process at least once every N seconds
+        self._clock = clock
+
+        self._reference = None
+        self._last_motion = -float("inf")
+        self._last_processed = -float("inf")
+
+        self.frames = 0
+        self.processed = 0
+        self.gate_seconds = 0.0
+        self.processing_seconds = 0.0
+
+    def _thumbnail(self, frame):
+        h, w = frame.shape[:2]
+        size = (self.width, max(1, int(h * self.width / w)))
+        small = cv2.resize(frame, size, interpolation=cv2.INTER_AREA)
+        if small.ndim == 3:
+            small = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+        return cv2.GaussianBlur(small, (5, 5), 0)
+
+    def check(self, frame, faces_present=False):
+        """
+        Returns True when the frame should go through recognition.
+        faces_present: the previous processed frame had faces (keeps the gate open).
+        """
+        start = time.perf_counter()
+        now = self._clock()
+        self.frames += 1
+
+        thumb = self._thumbnail(frame)
+        if self._reference is None or self._reference.shape != thumb.shape:
+            changed = 1.0
+        else:
+            changed = np.count_nonzero(cv2.absdiff(thumb, self._reference) > self.pixel_threshold) / thumb.size
+
+        if changed >= self.area_threshold:
+            self._last_motion = now
+
+        process = (faces_present
+                   or now - self._last_motion <= self.hold
+                   or now - self._last_processed >= self.refresh)
+        if process:
+            self._reference = thumb
+            self._last_processed = now
+            self.processed += 1
+
+        self.gate_seconds += time.perf_counter() - start
+        return process
+
+    def record(self, seconds):
+        """Adds the recognition time of a processed frame (for the saved-time estimate)."""
+        self.processing_seconds += seconds
+
+    @property
+    def duty_cycle(self):
+        return self.processed / self.frames if self.frames else 1.0
+
+    def stats(self):
+        skipped = self.frames - self.processed
+        avg_processing = self.processing_seconds / self.processed if self.processed else 0.0
+        return {
+            "frames": self.frames,
+            "processed": self.processed,
+            "skipped": skipped,
+            "duty_cycle": self.duty_cycle,
+            "gate_ms": 1000.0 * self.gate_seconds / self.frames if self.frames else 0.0,
+            "saved_seconds": max(0.0, skipped * avg_processing - self.gate_seconds),
+        }
@@ -0,0 +1,141 @@
+import threading
+import time
+from collections import deque
+from .video_stream import VideoStream
+
+
+class Camera:
+    """
+    One camera feeding the shared pool: its stream, tracking/liveness state
+    and rolling FPS / latency statistics.
+    """
+    def __init__(self, name, stream, state):
+        self.name = name
+        self.stream = stream
+        self.state = state          # recognizer StreamState, only touched by one worker at a time
+        self.last_seq = 0
+        self.busy = False
+        self.latest = None          # (frame, results) of the newest processed frame
+        self.processed = 0
+        self._done_at = deque(maxlen=30)
+        self._latencies = deque(maxlen=30)
+
+    def record(self, latency):
+        self._done_at.append(time.perf_counter())
+        self._latencies.append(latency)
+        self.processed += 1
+
+    @property
+    def fps(self):
+        if len(self._done_at) < 2:
+            return 0.0
+        span = self._done_at[-1] - self._done_at[0]
+        return (len(self._done_at) - 1) / span if span > 0 else 0.0
+
+    @property
+    def latency_ms(self):
+        if not self._latencies:
+            return 0.0
+        return 1000.0 * sum(self._latencies) / len(self._latencies)
+
+    def stats(self):
+        ring = self.stream.ring.stats()
+        return {
+            "name": self.name,
+            "fps": self.fps,
+            "latency_ms": self.latency_ms,
+            "processed": self.processed,
+            "captured": ring["captured"],
+            "dropped": ring["captured"] - ring["delivered"],
+        }
+
+
+class CameraPool:
+    """
+    Several camera sources served by one recognizer and a shared pool of
+    worker threads, so the dlib models are loaded once per machine.
+
+    Scheduling is round-robin over cameras that have a new frame and are not
+    already being processed. A camera is never handled by two workers at the
+    same time, which keeps its tracking state consistent, and a fast camera
+    cannot starve a slow one.
+    """
+
+    def __init__(self, recognizer, sources, workers=2, on_result=None):
+        self.recognizer = recognizer
+        self.on_result = on_result  # Optional callback(camera, frame, results), called on a worker thread
+        self.cameras = [
+            Camera(str(src), VideoStream(src=src), recognizer.new_stream())
+            for src in sources
+        ]
+        self.workers = max(1, workers)
+        self._lock = threading.Condition()
+        self._next = 0
+        self._stopped = False
+        self._threads = []
+
+    def start(self):
+        for camera in self.cameras:
+            camera.stream.start()
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._work, name=f"recognizer-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        return self
+
+    def _claim(self):
+        """Picks the next camera (round-robin) with an unprocessed frame and marks it busy."""
+        with self._lock:
+            count = len(self.cameras)
+            for offset in range(count):
+                camera = self.cameras[(self._next + offset) % count]
+                if not camera.busy and camera.stream.ring.seq > camera.last_seq:
+                    camera.busy = True
+                    self._next = (self._next + offset + 1) % count
+                    return camera
+            return None
+
+    def _release(self, camera):
+        with self._lock:
+            camera.busy = False
+            self._lock.notify_all()
+
+    def _work(self):
+        while not self._stopped:
+            camera = self._claim()
+            if camera is None:
+                # Nothing new on any camera: wait briefly for the next capture
+                with self._lock:
+                    self._lock.wait(timeout=0.005)
+                continue
+
+            try:
+                camera.last_seq, frame = camera.stream.read_next(camera.last_seq, timeout=0, copy=True)
+                if frame is None:
+                    continue
+                start = time.perf_counter()
+                results = self.recognizer.recognize_frame(frame, stream=camera.state)
+                camera.record(time.perf_counter() - start)
+                camera.latest = (frame, results)
+                if self.on_result:
+                    self.on_result(camera, frame, results)
+            except Exception as e:
+                print(f"[ERROR] Camera {camera.name}: {e}")
+            finally:
+                self._release(camera)
+
+    @property
+    def active(self):
+        return any(not camera.stream.stopped for camera in self.cameras)
+
+    def stats(self):
+        return [camera.stats() for camera in self.cameras]
+
+    def stop(self):
+        self._stopped = True
+        with self._lock:
+            self._lock.notify_all()
+        for thread in self._threads:
+            thread.join(timeout=1.0)
+        for camera in self.cameras:
+            camera.stream.stop()
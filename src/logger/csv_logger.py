@@ -1,43 +1,125 @@
+import atexit
 import csv
-import os
+import threading
 from pathlib import Path
 from datetime import datetime
 
+HEADER = ["Name", "ID", "Role", "Time", "Status"]
+
+
 class CSVLogger:
     """
-    Logs attendance to a CSV file.
+    Logs attendance to one CSV file per day.
+
+    Rows are buffered and appended in one go every `flush_interval` seconds
+    or once `max_buffer` rows are waiting, instead of opening the file per
+    entry. The file follows the calendar: the first entry (or flush) after
+    midnight switches to the new day's file. Who was already logged today is
+    read back from that file, so a restart does not log anyone twice.
+    Safe to share between threads.
     """
 
-    def __init__(self, file_path: str):
+    def __init__(self, file_path: str, flush_interval: float = 2.0, max_buffer: int = 50):
         self.base_path = Path(file_path)
         # Create folder if it doesn't exist
         self.base_path.parent.mkdir(parents=True, exist_ok=True)
-        
-        # Use ONE file per day
-        self.date_str = datetime.now().strftime("%d-%m-%Y")
+        self.flush_interval = flush_interval
+        self.max_buffer = max_buffer
+
+        self._lock = threading.Lock()
+        self._buffer = []
+        self._stop = threading.Event()
+        self._thread = None
+
+        self.date_str = None
+        self.file_path = None
+        self.logged_users = set() # IDs already in today's file (or buffered for it)
+        with self._lock:
+            self._open_day(datetime.now())
+        atexit.register(self.close)
+
+    # --- DAY FILE ---
+    def _open_day(self, now: datetime) -> None:
+        """Switches to now's file (one per day) and rebuilds the dedup set from it."""
+        self.date_str = now.strftime("%d-%m-%Y")
         self.file_path = self.base_path.parent / f"{self.date_str}_attendance.csv"
-        
-        self.logged_users = set() # Track IDs to prevent duplicate logs in one session
+        self.logged_users = self._read_logged_users()
         self._write_header()
 
+    def _read_logged_users(self) -> set:
+        if not self.file_path.exists():
+            return set()
+        with self.file_path.open(mode="r", newline="", encoding='utf-8') as file:
+            reader = csv.reader(file)
+            next(reader, None) # Header
+            return {row[1] for row in reader if len(row) > 1}
+
     def _write_header(self) -> None:
         """Write CSV header if file doesn't exist."""
         if not self.file_path.exists() or self.file_path.stat().st_size == 0:
             with self.file_path.open(mode="w", newline="", encoding='utf-8') as file:
-                writer = csv.writer(file)
-                # Updated Header with Role
-                writer.writerow(["Name", "ID", "Role", "Time", "Status"])
+                csv.writer(file).writerow(HEADER)
 
-    def log_attendance(self, name: str, user_id: str, role: str) -> None:
+    def _rotate(self, now: datetime) -> None:
+        """Past midnight: finish yesterday's file, then start today's."""
+        if now.strftime("%d-%m-%Y") != self.date_str:
+            self._flush_locked()
+            self._open_day(now)
+
+    # --- LOGGING ---
+    def log_attendance(self, name: str, user_id: str, role: str) -> bool:
         """
-        Log attendance for a person.
+        Log attendance for a person. Returns False if they are already logged today.
         """
-        # Simple duplicate check for this session
-        if user_id not in self.logged_users:
+        now = datetime.now()
+        with self._lock:
+            self._rotate(now)
+            if user_id in self.logged_users:
+                return False
             self.logged_users.add(user_id)
-            
-            timestamp = datetime.now().strftime("%H:%M:%S")
+            self._buffer.append([name, user_id, role, now.strftime("%H:%M:%S"), "Present"])
+
+            if len(self._buffer) >= self.max_buffer:
+                self._flush_locked()
+        self._ensure_flusher()
+        return True
+
+    def flush(self) -> None:
+        """Writes buffered rows to the current day's file."""
+        with self._lock:
+            self._flush_locked()
+
+    def _flush_locked(self) -> None:
+        if not self._buffer:
+            return
+        rows, self._buffer = self._buffer, []
+        try:
             with self.file_path.open(mode="a", newline="", encoding='utf-8') as file:
-                writer = csv.writer(file)
-                # Writing the Role column
-                writer.writerow([name, user_id, role, timestamp, "Present"])
+                csv.writer(file).writerows(rows)
+        except Exception:
+            self._buffer = rows + self._buffer # Keep them for the next attempt
+            raise
+
+    # --- PERIODIC FLUSH ---
+    def _ensure_flusher(self) -> None:
+        if self._thread is None and not self._stop.is_set():
+            with self._lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._run, name="csv-logger", daemon=True)
+                    self._thread.start()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.flush_interval):
+            try:
+                with self._lock:
+                    self._flush_locked()
+                    self._rotate(datetime.now())
+            except Exception as e:
+                print(f"[ERROR] CSV flush failed: {e}")
+
+    def close(self) -> None:
+        """Stops the periodic flush and writes what is still buffered."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.flush_interval + 1.0)
+        self.flush()
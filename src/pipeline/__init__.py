@@ -0,0 +1,2 @@
+from .stages import DropOldestQueue, Stage, Pipeline
+from .recognition import build_recognition_pipeline
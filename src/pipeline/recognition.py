@@ -0,0 +1,34 @@
+import time
+from .stages import Pipeline
+
+
+def build_recognition_pipeline(recognizer, read_frame, queue_size=2):
+    """
+    capture -> detect -> identify -> liveness, each on its own thread.
+
+    read_frame() returns the next BGR frame (or None if none is ready).
+    The pipeline output yields FrameJob objects with .results filled in and
+    .captured_at set; rendering is left to the caller's (main) thread.
+    """
+    def capture():
+        frame = read_frame()
+        if frame is None:
+            time.sleep(0.005)
+            return None
+        return (time.perf_counter(), frame)
+
+    def detect(item):
+        captured_at, frame = item
+        job = recognizer.detect_stage(frame)
+        job.captured_at = captured_at
+        return job
+
+    def liveness(job):
+        recognizer.liveness_stage(job)
+        return job
+
+    return (Pipeline(queue_size)
+            .add("capture", capture)
+            .add("detect", detect)
+            .add("identify", recognizer.identify_stage)
+            .add("liveness", liveness))
@@ -0,0 +1,154 @@
+import threading
+import time
+from collections import deque
+
+
+class DropOldestQueue:
+    """
+    Bounded queue that never blocks the producer: when full, the oldest item
+    is discarded. Keeps live video pipelines on the newest frames.
+    """
+
+    def __init__(self, maxsize=2):
+        self.maxsize = maxsize
+        self.dropped = 0
+        self._items = deque()
+        self._cond = threading.Condition()
+
+    def put(self, item):
+        with self._cond:
+            if len(self._items) >= self.maxsize:
+                self._items.popleft()
+                self.dropped += 1
+            self._items.append(item)
+            self._cond.notify()
+
+    def get(self, timeout=None):
+        """Returns the oldest item, or None after `timeout` seconds."""
+        with self._cond:
+            if not self._cond.wait_for(lambda: self._items, timeout=timeout):
+                return None
+            return self._items.popleft()
+
+    def __len__(self):
+        return len(self._items)
+
+
+class StageStats:
+    """Rolling latency window and counters for one stage."""
+
+    def __init__(self, window=100):
+        self.latencies = deque(maxlen=window)
+        self.processed = 0
+        self.errors = 0
+
+    def record(self, seconds):
+        self.latencies.append(seconds)
+        self.processed += 1
+
+    @property
+    def avg_ms(self):
+        if not self.latencies:
+            return 0.0
+        return 1000.0 * sum(self.latencies) / len(self.latencies)
+
+    @property
+    def max_ms(self):
+        return 1000.0 * max(self.latencies) if self.latencies else 0.0
+
+
+class Stage:
+    """
+    One pipeline step on its own thread: takes items from in_queue, applies
+    func and puts the result on out_queue. A stage without in_queue is a
+    source: func() is called in a loop and returns the next item (None = skip).
+    Returning None from a non-source stage drops the item.
+    """
+
+    def __init__(self, name, func, in_queue=None, out_queue=None):
+        self.name = name
+        self.func = func
+        self.in_queue = in_queue
+        self.out_queue = out_queue
+        self.stats = StageStats()
+        self._stopped = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name=f"stage-{self.name}", daemon=True)
+        self._thread.start()
+        return self
+
+    def _run(self):
+        while not self._stopped.is_set():
+            if self.in_queue is not None:
+                item = self.in_queue.get(timeout=0.1)
+                if item is None:
+                    continue
+                args = (item,)
+            else:
+                args = ()
+
+            start = time.perf_counter()
+            try:
+                out = self.func(*args)
+            except Exception as e:
+                self.stats.errors += 1
+                print(f"[ERROR] Stage '{self.name}' failed: {e}")
+                continue
+            self.stats.record(time.perf_counter() - start)
+
+            if out is not None and self.out_queue is not None:
+                self.out_queue.put(out)
+
+    def stop(self):
+        self._stopped.set()
+
+    def join(self, timeout=None):
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+
+class Pipeline:
+    """
+    Chain of stages connected by DropOldestQueues. The last queue (`output`)
+    is drained by the caller, e.g. the render loop on the main thread.
+    """
+
+    def __init__(self, queue_size=2):
+        self.queue_size = queue_size
+        self.stages = []
+        self.queues = []
+        self.output = None
+
+    def add(self, name, func):
+        """Appends a stage. The first stage added is the source (no input)."""
+        in_queue = self.output
+        out_queue = DropOldestQueue(self.queue_size)
+        self.stages.append(Stage(name, func, in_queue, out_queue))
+        self.queues.append(out_queue)
+        self.output = out_queue
+        return self
+
+    def start(self):
+        for stage in self.stages:
+            stage.start()
+        return self
+
+    def stop(self):
+        for stage in self.stages:
+            stage.stop()
+        for stage in self.stages:
+            stage.join(timeout=1.0)
+
+    def stats(self):
+        """Per-stage snapshot: [{name, avg_ms, max_ms, processed, errors, queue, dropped}, ...]."""
+        return [{
+            "name": stage.name,
+            "avg_ms": stage.stats.avg_ms,
+            "max_ms": stage.stats.max_ms,
+            "processed": stage.stats.processed,
+            "errors": stage.stats.errors,
+            "queue": len(stage.out_queue),
+            "dropped": stage.out_queue.dropped,
+        } for stage in self.stages]
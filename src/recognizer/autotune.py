@@ -0,0 +1,120 @@
+from collections import deque
+
+
+class AutoTuner:
+    """
+    Adjusts a FaceRecognitionSystem towards a target FPS at runtime.
+
+    Call update(frame_seconds) after every recognize_frame(). Once a window of
+    frames has been measured, the tuner compares the average frame time with
+    the budget (1 / target_fps):
+
+    - Over budget: the most expensive part gets cheaper. Detection cost per
+      frame is detect_ms / detect_interval, liveness cost is
+      (landmarks_ms + pose_ms) / liveness_interval (from the tracer's stage
+      latencies). Detection is first made cheaper by lowering the detection
+      scale, then by detecting less often; liveness by checking less often
+      (at most every 2nd frame by default, so a normal blink is still sampled).
+    - Well under budget: the last cheapening steps are undone in reverse, up
+      to the configured detection scale (small faces are found again).
+
+    Every change is printed and kept in self.history.
+    """
+
+    OVER_BUDGET = 1.05      # Frame time above budget * this -> cheapen
+    UNDER_BUDGET = 0.7      # Frame time below budget * this -> restore quality
+    SCALE_STEP = 0.05
+
+    def __init__(self, recognizer, target_fps, window=30, min_scale=0.15, max_scale=None,
+                 max_detect_interval=8, max_liveness_interval=2):
+        self.recognizer = recognizer
+        self.target_fps = target_fps
+        self.window = window
+        self.min_scale = min_scale
+        self.max_scale = max_scale or recognizer.detection_scale
+        self.max_detect_interval = max_detect_interval
+        self.max_liveness_interval = max_liveness_interval
+        self.history = []
+        self._frames = deque(maxlen=window)
+
+        # Stage latencies come from the tracer
+        if not recognizer.tracer.enabled:
+            recognizer.tracer.enabled = True
+
+    @property
+    def budget_ms(self):
+        return 1000.0 / self.target_fps
+
+    def settings(self):
+        r = self.recognizer
+        return {
+            "detection_scale": round(r.detection_scale, 3),
+            "detect_interval": r.detect_interval,
+            "liveness_interval": r.liveness_interval,
+        }
+
+    def update(self, frame_seconds):
+        """Adds one frame time. Returns True when the settings were changed."""
+        self._frames.append(frame_seconds * 1000.0)
+        if len(self._frames) < self.window:
+            return False
+
+        frame_ms = sum(self._frames) / len(self._frames)
+        if frame_ms > self.budget_ms * self.OVER_BUDGET:
+            changed = self._cheapen()
+        elif frame_ms < self.budget_ms * self.UNDER_BUDGET:
+            changed = self._restore()
+        else:
+            changed = False
+
+        if changed:
+            # Measure the new settings from scratch
+            self._frames.clear()
+            self.history.append((frame_ms, self.settings()))
+            print(f"[TUNE] {frame_ms:.1f}ms/frame (target {self.budget_ms:.1f}ms) -> {self.report()}")
+        return changed
+
+    def _stage_costs(self):
+        """Per-frame cost (ms) of detection and liveness, amortized over their intervals."""
+        r = self.recognizer
+        stats = r.tracer.stats()
+        avg = lambda name: stats.get(name, {}).get("avg_ms", 0.0)
+        detect = avg("detect") / r.detect_interval
+        liveness = (avg("landmarks") + avg("pose")) / r.liveness_interval
+        return detect, liveness
+
+    def _cheapen(self):
+        r = self.recognizer
+        detect, liveness = self._stage_costs()
+
+        if liveness > detect and r.liveness_interval < self.max_liveness_interval:
+            r.liveness_interval += 1
+            return True
+        if r.detection_scale - self.SCALE_STEP >= self.min_scale - 1e-9:
+            r.detection_scale = round(r.detection_scale - self.SCALE_STEP, 3)
+            return True
+        if r.detect_interval < self.max_detect_interval:
+            r.detect_interval += 1
+            return True
+        if r.liveness_interval < self.max_liveness_interval:
+            r.liveness_interval += 1
+            return True
+        return False # Already at the cheapest settings
+
+    def _restore(self):
+        r = self.recognizer
+        if r.liveness_interval > 1:
+            r.liveness_interval -= 1
+            return True
+        if r.detect_interval > 1:
+            r.detect_interval -= 1
+            return True
+        if r.detection_scale + self.SCALE_STEP <= self.max_scale + 1e-9:
+            r.detection_scale = round(r.detection_scale + self.SCALE_STEP, 3)
+            return True
+        return False
+
+    def report(self):
+        s = self.settings()
+        return (f"scale {s['detection_scale']:.2f} | detect every {s['detect_interval']} | "
+                f"liveness every {s['liveness_interval']}")
@@ -0,0 +1,174 @@
+import os
+import pickle
+import struct
+import time
+import zlib
+import numpy as np
+
+
+class EncodingStore:
+    """
+    Versioned on-disk gallery: a memory-mapped float32 matrix plus a label table.
+
+    Layout (for path 'models/encodings.bin'):
+        models/encodings.bin     32-byte header + N x 128 float32 rows (little endian)
+        models/encodings.labels  UTF-8, one label per line, same order as the rows
+
+    Loading maps the matrix read-only instead of reading it, so startup cost does
+    not grow with the gallery and several recognizer processes share the same
+    page-cache pages.
+
+    The header records how many rows are committed and a CRC-32 of their
+    labels. Enrolment appends rows, then labels, and updates the header last,
+    so a torn append is ignored on load. A rewrite replaces both files; a
+    reader that catches it between the two renames sees labels that do not
+    match the header's checksum and loads again instead of pairing them.
+    Every write or append also stamps the header, so (rows, labels crc, stamp)
+    identifies the contents; load() keeps it in self.key for derived caches.
+    """
+
+    MAGIC = b"SAENC\x00\x00\x00"
+    VERSION = 2
+    DIM = 128
+    HEADER = struct.Struct("<8sIIIIQ") # magic, version, dim, rows, labels crc32, write stamp (ns)
+    LOAD_ATTEMPTS = 5
+
+    def __init__(self, path="models/encodings.bin"):
+        self.path = path
+        self.labels_path = os.path.splitext(path)[0] + ".labels"
+        self.key = None # (rows, labels crc, stamp) of the last load(), None for version 1 stores
+
+    def exists(self):
+        return os.path.exists(self.path) and os.path.exists(self.labels_path)
+
+    # --- READ ---
+    def _read_header(self, f):
+        """Returns (version, dim, rows, crc, stamp); crc and stamp are None for version 1 stores."""
+        raw = f.read(self.HEADER.size)
+        if len(raw) < self.HEADER.size:
+            raise ValueError(f"{self.path}: truncated header")
+
+        magic, version, dim, rows, crc, stamp = self.HEADER.unpack(raw)
+        if magic != self.MAGIC:
+            raise ValueError(f"{self.path}: not an encodings store")
+        if version > self.VERSION:
+            raise ValueError(f"{self.path}: format version {version} is newer than supported ({self.VERSION})")
+        if version < 2:
+            # Version 1: bytes 16-31 were reserved, rows = those with a label
+            size = os.fstat(f.fileno()).st_size
+            rows = min((size - self.HEADER.size) // (dim * 4), len(self._read_labels()))
+            crc = stamp = None
+        return version, dim, rows, crc, stamp
+
+    def _read_labels(self):
+        with open(self.labels_path, "r", encoding="utf-8", newline="\n") as f:
+            data = f.read()
+        # The last line is only complete once its newline is written
+        return data.split("\n")[:-1]
+
+    @staticmethod
+    def _labels_crc(labels):
+        return zlib.crc32("".join(label + "\n" for label in labels).encode("utf-8"))
+
+    def load(self):
+        """
+        Returns (encodings, labels). encodings is a read-only (N, 128) float32 memmap.
+        """
+        for attempt in range(self.LOAD_ATTEMPTS):
+            # Header and mapping come from one open file, so a concurrent
+            # rename cannot pair this header with another file's rows
+            with open(self.path, "rb") as f:
+                _, dim, count, crc, stamp = self._read_header(f)
+                labels = self._read_labels()[:count]
+                if len(labels) == count and (crc is None or self._labels_crc(labels) == crc):
+                    self.key = (count, crc, stamp) if crc is not None else None
+                    if count == 0:
+                        return np.empty((0, dim), dtype=np.float32), []
+                    matrix = np.memmap(f, dtype="<f4", mode="r", offset=self.HEADER.size, shape=(count, dim))
+                    return matrix, labels
+            time.sleep(0.05 * (attempt + 1)) # Caught between the renames of a rewrite
+        raise ValueError(f"{self.labels_path}: labels do not match {self.path}")
+
+    def __len__(self):
+        if not self.exists():
+            return 0
+        with open(self.path, "rb") as f:
+            return self._read_header(f)[2]
+
+    # --- WRITE ---
+    @staticmethod
+    def _as_rows(encodings):
+        return np.ascontiguousarray(np.asarray(encodings, dtype="<f4").reshape(-1, EncodingStore.DIM))
+
+    @staticmethod
+    def _check_labels(labels):
+        for label in labels:
+            if "\n" in label or "\r" in label:
+                raise ValueError(f"Label contains a line break: {label!r}")
+
+    def _header(self, labels):
+        return self.HEADER.pack(self.MAGIC, self.VERSION, self.DIM, len(labels), self._labels_crc(labels),
+                                time.time_ns())
+
+    def write(self, encodings, labels):
+        """
+        Rewrites the whole store (temp files + rename). On Windows a file that
+        is memory-mapped cannot be replaced, so running recognizers, which keep
+        the matrix mapped, must be stopped first.
+        """
+        rows = self._as_rows(encodings) if len(encodings) else np.empty((0, self.DIM), dtype="<f4")
+        if len(rows) != len(labels):
+            raise ValueError(f"{len(rows)} encodings but {len(labels)} labels")
+        self._check_labels(labels)
+
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        tmp_bin, tmp_labels = self.path + ".tmp", self.labels_path + ".tmp"
+
+        with open(tmp_bin, "wb") as f:
+            f.write(self._header(labels))
+            f.write(rows.tobytes())
+        with open(tmp_labels, "w", encoding="utf-8", newline="\n") as f:
+            f.writelines(label + "\n" for label in labels)
+
+        # Between the renames the labels do not match the old header's checksum; load() retries
+        os.replace(tmp_labels, self.labels_path)
+        os.replace(tmp_bin, self.path)
+
+    def append(self, encodings, labels):
+        """Appends enrolments without rewriting existing rows."""
+        if not self.exists():
+            return self.write(encodings, labels)
+
+        rows = self._as_rows(encodings)
+        if len(rows) != len(labels):
+            raise ValueError(f"{len(rows)} encodings but {len(labels)} labels")
+        self._check_labels(labels)
+
+        # Drop any torn tail from an interrupted append so rows and labels stay aligned
+        existing = self._read_labels()
+        count = len(self)
+        committed = existing[:count]
+        end = self.HEADER.size + count * self.DIM * 4
+        with open(self.path, "r+b") as f:
+            if os.fstat(f.fileno()).st_size != end:
+                f.truncate(end)
+            f.seek(end)
+            f.write(rows.tobytes())
+
+        mode = "a" if len(existing) == count else "w"
+        with open(self.labels_path, mode, encoding="utf-8", newline="\n") as f:
+            if mode == "w":
+                f.writelines(label + "\n" for label in committed)
+            f.writelines(label + "\n" for label in labels)
+
+        # Commit: readers only see the new rows once the header counts them
+        with open(self.path, "r+b") as f:
+            f.write(self._header(committed + list(labels)))
+
+    # --- MIGRATION ---
+    def import_pickle(self, pickle_path):
+        """Converts a legacy encodings.pkl ({'encodings': [...], 'names': [...]}) into this store."""
+        with open(pickle_path, "rb") as f:
+            data = pickle.load(f)
+        self.write(data.get("encodings", []), data.get("names", []))
+        return len(data.get("names", []))
@@ -1,11 +1,31 @@
+import math
 import os
 import pickle
-import math
 import cv2
 import dlib
-import face_recognition
+import face_recognition.api as face_recognition_api
 import numpy as np
 from collections import deque
+from .gallery import FaceGallery
+from .index import make_index
+from .detectors import make_detector
+from .encodings_store import EncodingStore
+from .tracker import FaceTracker
+from .state_table import BoundedStateTable
+from .liveness import HeadPoseEstimator, eye_aspect_ratios
+from ..utils.tracing import StageTracer
+
+def encode_face(predictor, rgb, box):
+    """
+    128-d encoding of the face in box (top, right, bottom, left) of an RGB image,
+    aligned exactly like FaceRecognitionSystem's probes: 68-point landmarks
+    on grayscale, then the descriptor computed from that shape. Enrolment
+    must use this too, so gallery and probe faces match under MATCH_THRESHOLD.
+    """
+    top, right, bottom, left = box
+    gray = cv2.cvtColor(rgb, cv2.COLOR_RGB2GRAY)
+    shape = predictor(gray, dlib.rectangle(int(left), int(top), int(right), int(bottom)))
+    return np.array(face_recognition_api.face_encoder.compute_face_descriptor(rgb, shape, 1))
 
 class LivenessState:
     """
@@ -18,6 +38,37 @@ class LivenessState:
         self.consecutive_frames_closed = 0
         self.is_alive = False
         self.pose_history = deque(maxlen=10) 
+        self.pose = None # Last (rvec, tvec), warm-starts the next solvePnP
+        self.last_stats = {"ear": 0.0, "blinks": 0, "yaw": 0.0, "pitch": 0.0}
+
+class StreamState:
+    """
+    Per-camera temporal state: face tracks and their liveness.
+    One recognizer (models + gallery) can serve many streams.
+    """
+    def __init__(self, min_confidence, max_faces, ttl):
+        self.tracker = FaceTracker(min_confidence=min_confidence)
+        self.liveness_states = BoundedStateTable(LivenessState, max_size=max_faces, ttl=ttl)
+        self.frames_since_detect = 0
+        self.frames_since_liveness = 0
+        self.detection_scale = None # Scale the correlation trackers were started at
+
+class FrameJob:
+    """
+    Work item handed from one recognition stage to the next.
+    """
+    def __init__(self, frame, rgb_small, scale, stream):
+        self.frame = frame          # Full-resolution BGR frame
+        self.rgb_small = rgb_small  # Downscaled RGB frame used for detection/encoding
+        self.scale = scale
+        self.stream = stream        # StreamState the frame belongs to
+        self.locations = []         # Detections in rgb_small coordinates (empty on tracking frames)
+        self.tracks = []            # Tracks visible in this frame
+        self.boxes = {}             # track id -> box in this frame (tracks are moved on by later frames)
+        self.pending = []           # Tracks that need an identity
+        self.landmarks = {}         # track id -> (68, 2) full-frame landmarks from the shared pass
+        self.run_liveness = True    # False on frames skipped by liveness_interval
+        self.results = []
 
 class FaceRecognitionSystem:
     """
@@ -28,50 +79,66 @@ class FaceRecognitionSystem:
     EYE_AR_THRESH = 0.22        # EAR below this indicates closed eye
     EYE_AR_CONSEC_FRAMES = 2    # Frames eyes must be closed to count as blink
     POSE_THRESHOLD = 15         # Degrees of rotation (Yaw) to consider "movement"
-    
-    # 3D Model Points (Standard Face) for PnP Solver
-    # Nose tip, Chin, Left Eye Left Corner, Right Eye Right Corner, Left Mouth Corner, Right Mouth Corner
-    MODEL_POINTS = np.array([
-        (0.0, 0.0, 0.0),             # Nose tip
-        (0.0, -330.0, -65.0),        # Chin
-        (-225.0, 170.0, -135.0),     # Left eye left corner
-        (225.0, 170.0, -135.0),      # Right eye right corner
-        (-150.0, -150.0, -125.0),    # Left Mouth corner
-        (150.0, -150.0, -125.0)      # Right mouth corner
-    ], dtype="double")
-
-    def __init__(self, model_path='models/encodings.pkl', predictor_path='models/shape_predictor_68_face_landmarks.dat'):
+    MATCH_THRESHOLD = 0.6       # Max Euclidean distance for a positive match
+    IDENTITY_CONFIDENCE = 0.6   # Cached track identities below this confidence (0-1) are re-checked every detection
+    TOP_K = 3                   # Candidates reported per face
+    DETECTION_SCALE = 0.25      # Default downscale for detection (boxes are mapped back with 1 / scale)
+    LIVENESS_MAX_FACES = 256    # Liveness states kept at once (LRU beyond that)
+    LIVENESS_TTL = 30.0         # Seconds an unseen face keeps its liveness state
+    ROI_MARGIN = 0.25           # Extra context around a face box for the landmark ROI
+
+    def __init__(self, model_path='models/encodings.bin', predictor_path='models/shape_predictor_68_face_landmarks.dat',
+                 index="exact", detect_interval=1, tracer=None, detection_scale=None, liveness_interval=1,
+                 detector="hog"):
         """
         Args:
-            model_path: Path to pickle file with known faces.
+            model_path: Path to the encodings store (.bin) or a legacy pickle (.pkl) with known faces.
             predictor_path: Path to dlib 68-point landmark predictor.
+            index: Gallery search index, 'exact' or 'ivf' (approximate, for large galleries).
+            detect_interval: Run full detection every N frames and track faces in between (1 = every frame).
+            tracer: Optional StageTracer for per-stage timings (disabled by default).
+            detection_scale: Downscale factor for face detection (default DETECTION_SCALE). Larger finds
+                             smaller / farther faces, smaller is faster for close-up kiosks.
+            liveness_interval: Run the liveness check every N frames per stream (1 = every frame).
+                               Keep it at 2 or less: larger intervals can skip a whole blink.
+            detector: Face detector backend, 'hog' (dlib), 'haar' (OpenCV cascade, fastest) or
+                      'hybrid' (cascade proposals confirmed by HOG).
         """
         self.model_path = model_path
         self.predictor_path = predictor_path
-        self.known_encodings = []
-        self.known_labels = []
-        
-        # State tracking (Simple single-subject assumption for demo purposes)
-        self.global_liveness_state = LivenessState()
+        # IVF cells are trained once per store version and kept next to it
+        index_options = {"cache_path": os.path.splitext(model_path)[0] + ".ivf.npz"} if index == "ivf" else {}
+        self.gallery = FaceGallery(threshold=self.MATCH_THRESHOLD, index=make_index(index, **index_options))
+        self.tracer = tracer or StageTracer(enabled=False)
+        self.pose_estimator = HeadPoseEstimator() # Caches camera intrinsics per resolution
+        self.face_detector = make_detector(detector)
+
+        # Detect-then-track: identities are cached per track between detections (detect_interval > 1)
+        self.detect_interval = max(1, detect_interval)
+        self.detection_scale = detection_scale or self.DETECTION_SCALE
+        self.liveness_interval = max(1, liveness_interval)
+
+        # Tracks and per-face liveness (bounded table) of the default stream.
+        # Extra cameras get their own state from new_stream().
+        self.default_stream = self.new_stream()
 
         self._load_resources()
 
+    def new_stream(self):
+        """Creates independent tracking/liveness state for one more camera."""
+        return StreamState(self.IDENTITY_CONFIDENCE, self.LIVENESS_MAX_FACES, self.LIVENESS_TTL)
+
+    @property
+    def tracker(self):
+        return self.default_stream.tracker
+
+    @property
+    def liveness_states(self):
+        return self.default_stream.liveness_states
+
     def _load_resources(self):
         """Loads models and encodings with error handling."""
-        print(f"[INFO] Loading encodings from {self.model_path}...")
-        print(f"[DEBUG] Absolute path check: {os.path.abspath(self.model_path)}")
-        try:
-            print(f"[DEBUG] Absolute path check: {os.path.abspath(self.model_path)}")
-            if os.path.exists(self.model_path):
-                with open(self.model_path, "rb") as f:
-                    data = pickle.load(f)
-                self.known_encodings = data.get("encodings", [])
-                self.known_labels = data.get("names", [])
-                print(f"[INFO] Loaded {len(self.known_encodings)} face encodings.")
-            else:
-                print(f"[WARNING] Encodings file not found at {self.model_path}. Starting empty.")
-        except Exception as e:
-            print(f"[ERROR] Failed to load encodings: {e}")
+        self.load_encodings()
 
         print(f"[INFO] Loading landmark predictor...")
         if not os.path.exists(self.predictor_path):
@@ -83,165 +150,269 @@ class FaceRecognitionSystem:
         self.detector = dlib.get_frontal_face_detector()
         self.predictor = dlib.shape_predictor(self.predictor_path)
 
-    def _calculate_confidence_percentage(self, face_distance, face_match_threshold=0.6):
-        """
-        Maps Euclidean distance to a 0-100% confidence score.
-        Non-linear mapping: 0.0->100%, 0.6->50%, >0.6->Low
+    def load_encodings(self):
         """
-        if face_distance > face_match_threshold:
-            range_val = (1.0 - face_match_threshold)
-            linear_val = (1.0 - face_distance) / (range_val * 2.0)
-            return max(0.0, linear_val) # Clamp to 0
-        else:
-            range_val = face_match_threshold
-            linear_val = 1.0 - (face_distance / (range_val * 2.0))
-            # Curve to boost high confidence matches
-            return min(1.0, linear_val + ((1.0 - linear_val) * math.pow((linear_val - 0.5) * 2, 0.2)))
-
-    def _get_eye_aspect_ratio(self, eye_points):
-        """Calculates EAR using numpy (no scipy needed)."""
-        # Vertical distances
-        A = np.linalg.norm(eye_points[1] - eye_points[5])
-        B = np.linalg.norm(eye_points[2] - eye_points[4])
-        # Horizontal distance
-        C = np.linalg.norm(eye_points[0] - eye_points[3])
-        
-        if C == 0: return 0
-        ear = (A + B) / (2.0 * C)
-        return ear
-
-    def _get_head_pose(self, shape, img_h, img_w):
+        (Re)loads the gallery. The store is memory-mapped, so this is cheap and
+        can be called again to pick up newly appended enrolments.
         """
-        Estimates head pose (Yaw, Pitch, Roll) using SolvePnP.
-        Maps 2D landmarks to 3D anthropometric face model.
-        """
-        # Extract specific 2D points from dlib shape to match self.MODEL_POINTS
-        # Dlib indices: Nose=30, Chin=8, L_Eye=36, R_Eye=45, L_Mouth=48, R_Mouth=54
-        image_points = np.array([
-            (shape.part(30).x, shape.part(30).y),     # Nose tip
-            (shape.part(8).x, shape.part(8).y),       # Chin
-            (shape.part(36).x, shape.part(36).y),     # Left eye left corner
-            (shape.part(45).x, shape.part(45).y),     # Right eye right corner
-            (shape.part(48).x, shape.part(48).y),     # Left Mouth corner
-            (shape.part(54).x, shape.part(54).y)      # Right mouth corner
-        ], dtype="double")
-
-        # Camera internals (approximate)
-        focal_length = img_w
-        center = (img_w / 2, img_h / 2)
-        camera_matrix = np.array([
-            [focal_length, 0, center[0]],
-            [0, focal_length, center[1]],
-            [0, 0, 1]
-        ], dtype="double")
-        
-        dist_coeffs = np.zeros((4, 1)) # Assume no lens distortion
-
-        success, rotation_vector, translation_vector = cv2.solvePnP(
-            self.MODEL_POINTS, image_points, camera_matrix, dist_coeffs, flags=cv2.SOLVEPNP_ITERATIVE
-        )
-
-        if not success:
-            return 0, 0, 0
-
-        # Convert rotation vector to euler angles
-        rmat, _ = cv2.Rodrigues(rotation_vector)
-        proj_matrix = np.hstack((rmat, translation_vector))
-        
-        # decomposeProjectionMatrix returns (euler_x, euler_y, euler_z) -> (pitch, yaw, roll)
-        euler_angles = cv2.decomposeProjectionMatrix(proj_matrix)[6] 
-        
-        pitch, yaw, roll = [float(val) for val in euler_angles]
-        return pitch, yaw, roll
-
-    def recognize_frame(self, frame):
+        print(f"[INFO] Loading encodings from {self.model_path}...")
+        print(f"[DEBUG] Absolute path check: {os.path.abspath(self.model_path)}")
+        try:
+            if self.model_path.endswith(".pkl"):
+                # Legacy format: whole pickle is read into memory
+                if os.path.exists(self.model_path):
+                    with open(self.model_path, "rb") as f:
+                        data = pickle.load(f)
+                    self.gallery.set(data.get("encodings", []), data.get("names", []))
+                    print(f"[INFO] Loaded {len(self.gallery)} face encodings.")
+                else:
+                    print(f"[WARNING] Encodings file not found at {self.model_path}. Starting empty.")
+                return
+
+            store = EncodingStore(self.model_path)
+            legacy_path = os.path.splitext(self.model_path)[0] + ".pkl"
+            if not store.exists() and os.path.exists(legacy_path) and os.path.getsize(legacy_path) > 0:
+                count = store.import_pickle(legacy_path)
+                print(f"[INFO] Migrated {count} encodings from {legacy_path} to {self.model_path}.")
+                print("[WARNING] Re-run force_encode.py so enrolments use the same face alignment as recognition.")
+
+            if store.exists():
+                encodings, labels = store.load()
+                self.gallery.set(encodings, labels, key=store.key)
+                print(f"[INFO] Loaded {len(self.gallery)} face encodings (memory-mapped).")
+            else:
+                print(f"[WARNING] Encodings file not found at {self.model_path}. Starting empty.")
+        except Exception as e:
+            print(f"[ERROR] Failed to load encodings: {e}")
+
+    @property
+    def known_encodings(self):
+        """Gallery matrix (N, 128) float32."""
+        return self.gallery.encodings
+
+    @property
+    def known_labels(self):
+        return self.gallery.labels
+
+    def _face_landmarks(self, frame, box, encode=False):
         """
-        Processes a frame: detects faces, recognizes them, and checks liveness.
-        Returns a list of result dictionaries.
+        One 68-point landmark pass per face, shared by encoding and liveness.
+        Works on a small ROI around the face, so only the ROI is converted to
+        grayscale (and to RGB when an encoding is needed).
+        Returns (coords (68, 2) in full-frame pixels, encoding or None).
         """
-        # 1. Optimization: Resize for faster detection (1/4th scale)
-        small_frame = cv2.resize(frame, (0, 0), fx=0.25, fy=0.25)
-        rgb_small_frame = cv2.cvtColor(small_frame, cv2.COLOR_BGR2RGB)
-        gray_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY) # Full res for landmarks
-        
+        top, right, bottom, left = box
         h, w = frame.shape[:2]
+        margin_y = int((bottom - top) * self.ROI_MARGIN)
+        margin_x = int((right - left) * self.ROI_MARGIN)
+        y0, y1 = max(0, top - margin_y), min(h, bottom + margin_y)
+        x0, x1 = max(0, left - margin_x), min(w, right + margin_x)
+        if y1 <= y0 or x1 <= x0:
+            # Box drifted out of the frame (tracking): fall back to the full frame
+            y0, y1, x0, x1 = 0, h, 0, w
+        roi = frame[y0:y1, x0:x1]
 
-        # 2. Detect Faces
-        face_locations = face_recognition.face_locations(rgb_small_frame)
-        face_encodings = face_recognition.face_encodings(rgb_small_frame, face_locations)
+        # Get landmarks (in ROI coordinates)
+        with self.tracer.span("landmarks"):
+            gray_roi = cv2.cvtColor(roi, cv2.COLOR_BGR2GRAY)
+            rect = dlib.rectangle(int(left - x0), int(top - y0), int(right - x0), int(bottom - y0))
+            shape = self.predictor(gray_roi, rect)
 
-        results = []
+            # Convert to numpy, back in full-frame coordinates
+            coords = np.array([(p.x + x0, p.y + y0) for p in shape.parts()], dtype=int)
 
-        for (top, right, bottom, left), face_encoding in zip(face_locations, face_encodings):
-            # 3. Recognition Logic
-            matches = face_recognition.compare_faces(self.known_encodings, face_encoding, tolerance=0.6)
-            face_distances = face_recognition.face_distance(self.known_encodings, face_encoding)
-            
-            name = "Unknown"
-            confidence = 0.0
-            distance = 1.0
-
-            if len(face_distances) > 0:
-                best_match_index = np.argmin(face_distances)
-                distance = face_distances[best_match_index]
-                
-                # Use the calculated distance to determine name and confidence
-                if distance < 0.6:
-                    name = self.known_labels[best_match_index]
-                    confidence = self._calculate_confidence_percentage(distance)
-                else:
-                    # Weak match, treat as unknown but show low confidence
-                    confidence = self._calculate_confidence_percentage(distance)
+        encoding = None
+        if encode:
+            # Same landmarks align the face chip for the 128-d encoder
+            with self.tracer.span("encode"):
+                rgb_roi = cv2.cvtColor(roi, cv2.COLOR_BGR2RGB)
+                encoding = np.array(face_recognition_api.face_encoder.compute_face_descriptor(rgb_roi, shape, 1))
+        return coords, encoding
 
-            # 4. Liveness Logic
-            # Scale coords back to original frame
-            scale = 4
-            dlib_rect = dlib.rectangle(int(left * scale), int(top * scale), int(right * scale), int(bottom * scale))
-            
-            # Get landmarks
-            shape = self.predictor(gray_frame, dlib_rect)
-            
-            # Convert to numpy
-            coords = np.zeros((68, 2), dtype=int)
-            for i in range(0, 68):
-                coords[i] = (shape.part(i).x, shape.part(i).y)
+    def _update_liveness(self, states, landmarks, h, w):
+        """
+        Runs EAR and head pose for all faces of a frame at once and advances
+        each face's state. landmarks: (N, 68, 2), one row per state.
+        """
+        # EAR (Blink Detection)
+        ears = eye_aspect_ratios(landmarks)
 
-            # EAR (Blink Detection)
-            leftEye = coords[42:48]
-            rightEye = coords[36:42]
-            leftEAR = self._get_eye_aspect_ratio(leftEye)
-            rightEAR = self._get_eye_aspect_ratio(rightEye)
-            avg_ear = (leftEAR + rightEAR) / 2.0
+        # Head Pose, warm-started from each face's previous solution
+        with self.tracer.span("pose"):
+            angles, poses = self.pose_estimator.estimate(landmarks, h, w, [state.pose for state in states])
 
-            # Head Pose
-            pitch, yaw, roll = self._get_head_pose(shape, h, w)
+        # Closed samples that make a blink: with liveness_interval > 1 only every
+        # Nth frame is sampled, so a normal blink shows up in fewer samples
+        closed_needed = max(1, math.ceil(self.EYE_AR_CONSEC_FRAMES / self.liveness_interval))
+
+        for state, avg_ear, (pitch, yaw, roll), pose in zip(states, ears, angles, poses):
+            state.pose = pose
+            avg_ear, pitch, yaw = float(avg_ear), float(pitch), float(yaw)
 
             # Update State Machine
             if avg_ear < self.EYE_AR_THRESH:
-                self.global_liveness_state.consecutive_frames_closed += 1
+                state.consecutive_frames_closed += 1
             else:
-                if self.global_liveness_state.consecutive_frames_closed >= self.EYE_AR_CONSEC_FRAMES:
-                    self.global_liveness_state.total_blinks += 1
-                    self.global_liveness_state.is_alive = True # Valid blink detected
-                self.global_liveness_state.consecutive_frames_closed = 0
+                if state.consecutive_frames_closed >= closed_needed:
+                    state.total_blinks += 1
+                    state.is_alive = True # Valid blink detected
+                state.consecutive_frames_closed = 0
 
             # If user turns head significantly, mark as alive
             if abs(yaw) > self.POSE_THRESHOLD or abs(pitch) > self.POSE_THRESHOLD:
-                self.global_liveness_state.is_alive = True
-
-            # 5. Pack Results
-            results.append({
-                "label": name,
-                "confidence": confidence,
-                "liveness_ok": self.global_liveness_state.is_alive,
-                "box": (top * scale, right * scale, bottom * scale, left * scale),
-                "stats": {
-                    "ear": avg_ear,
-                    "blinks": self.global_liveness_state.total_blinks,
-                    "yaw": yaw,
-                    "pitch": pitch
-                },
-                "landmarks": coords # Optional: Remove if sending to UI is too slow
-            })
-
-        return results
+                state.is_alive = True
+
+            state.last_stats = {
+                "ear": avg_ear,
+                "blinks": state.total_blinks,
+                "yaw": yaw,
+                "pitch": pitch
+            }
+
+    def recognize_frame(self, frame, stream=None):
+        """
+        Processes a frame: detects faces, recognizes them, and checks liveness.
+        stream: StreamState of the camera the frame came from (default stream if None).
+        Returns a list of result dictionaries.
+        """
+        with self.tracer.span("frame"):
+            job = self.detect_stage(frame, stream)
+            self.identify_stage(job)
+            return self.liveness_stage(job)
+
+    # --- PIPELINE STAGES ---
+    # recognize_frame() runs these back to back. They can also run on separate
+    # threads (one frame per stage at a time), see src/pipeline.
+
+    def detect_stage(self, frame, stream=None):
+        """Stage 1: downscale and detect (or track) faces. Returns a FrameJob."""
+        stream = stream or self.default_stream
+        tracker = stream.tracker
+
+        # 1. Optimization: Resize for faster detection (1/4th scale by default)
+        scale = self.detection_scale
+        with self.tracer.span("resize"):
+            small_frame = cv2.resize(frame, (0, 0), fx=scale, fy=scale)
+            rgb_small_frame = cv2.cvtColor(small_frame, cv2.COLOR_BGR2RGB)
+
+        job = FrameJob(frame, rgb_small_frame, scale, stream)
+
+        # 2. Detect Faces (every N frames, or in the frame where a tracked face is lost)
+        stream.frames_since_detect += 1
+        # Settings may change at runtime (AutoTuner): correlation trackers only
+        # work at the scale they were started at, so re-detect after a change.
+        run_detection = (self.detect_interval == 1
+                         or stream.frames_since_detect >= self.detect_interval
+                         or stream.detection_scale != scale
+                         or not any(t.missed == 0 for t in tracker.tracks)
+                         or any(t.missed == 0 and t.correlation is None for t in tracker.tracks))
+
+        # Liveness every N frames (blinks span several frames, so a small N still catches them)
+        stream.frames_since_liveness += 1
+        job.run_liveness = stream.frames_since_liveness >= self.liveness_interval
+        if job.run_liveness:
+            stream.frames_since_liveness = 0
+
+        if not run_detection:
+            with self.tracer.span("track"):
+                job.tracks = tracker.predict(rgb_small_frame, scale)
+            # A face the correlation tracker lost would be missing from this
+            # frame's results: detect again right away instead of next frame
+            run_detection = tracker.lost
+
+        if run_detection:
+            stream.frames_since_detect = 0
+            with self.tracer.span("detect"):
+                job.locations = self.face_detector.detect(rgb_small_frame)
+            job.tracks = tracker.update([
+                (int(top / scale), int(right / scale), int(bottom / scale), int(left / scale))
+                for (top, right, bottom, left) in job.locations
+            ])
+            stream.detection_scale = scale
+            if self.detect_interval > 1:
+                with self.tracer.span("track"):
+                    tracker.start_correlation(rgb_small_frame, scale, job.tracks)
+
+            # Detect-then-track: only new/uncertain/stale tracks need an encoding.
+            # Per-frame detection encodes every face, so a different person
+            # stepping into the same spot is never shown under the old name.
+            if self.detect_interval > 1:
+                job.pending = [t for t in job.tracks if tracker.needs_identity(t)]
+            else:
+                job.pending = list(job.tracks)
+
+        # Later stages may run while the next frame already moves the tracks
+        job.boxes = {t.id: t.box for t in job.tracks}
+        return job
+
+    def identify_stage(self, job):
+        """
+        Stage 2: one landmark pass for every face that needs an encoding or a
+        liveness check, then all new encodings scored against the gallery in one pass.
+        """
+        # 3. Recognition Logic
+        pending_ids = {t.id for t in job.pending}
+        face_encodings = []
+
+        for track in job.tracks:
+            state = job.stream.liveness_states.peek(track.id)
+            needs_liveness = job.run_liveness and (state is None or not state.is_alive)
+            if track.id not in pending_ids and not needs_liveness:
+                continue
+            coords, encoding = self._face_landmarks(job.frame, job.boxes[track.id], encode=track.id in pending_ids)
+            job.landmarks[track.id] = coords
+            if encoding is not None:
+                face_encodings.append(encoding)
+
+        if not job.pending:
+            return job
+
+        with self.tracer.span("match"):
+            matches = self.gallery.match(face_encodings, k=self.TOP_K)
+        for i, track in enumerate(job.pending):
+            name, confidence, distance = matches.best(i, self.MATCH_THRESHOLD)
+            if track.set_identity(name, confidence, distance, matches.candidates(i)):
+                # Someone else is in this track now: liveness must be shown again
+                job.stream.liveness_states.discard(track.id)
+        return job
+
+    def liveness_stage(self, job):
+        """Stage 3: liveness for all faces of the frame in one batch, then packing of the result dictionaries."""
+        h, w = job.frame.shape[:2]
+
+        results = []
+        live_states = []
+        live_coords = []
+
+        for track in job.tracks:
+            box = job.boxes[track.id]
+
+            # 4. Liveness Logic (skipped once this face has passed)
+            state = job.stream.liveness_states.get(track.id)
+            result = {
+                "track_id": track.id,
+                "label": track.label,
+                "confidence": track.confidence,
+                "distance": track.distance,
+                "candidates": track.candidates,
+                "box": box,
+            }
+            if job.run_liveness and not state.is_alive:
+                coords = job.landmarks.get(track.id)
+                if coords is None:
+                    coords, _ = self._face_landmarks(job.frame, box)
+                live_states.append(state)
+                live_coords.append(coords)
+                result["landmarks"] = coords # Optional: Remove if sending to UI is too slow
+            results.append((result, state))
+
+        if live_states:
+            self._update_liveness(live_states, np.stack(live_coords), h, w)
+
+        # 5. Pack Results
+        for result, state in results:
+            result["liveness_ok"] = state.is_alive
+            result["stats"] = dict(state.last_stats)
+
+        job.results = [result for result, _ in results]
+        return job.results
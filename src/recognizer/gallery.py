@@ -0,0 +1,109 @@
+import numpy as np
+from .index import ExactIndex
+
+
+def calibrate_confidence(distances, threshold=0.6):
+    """
+    Vectorized distance -> confidence mapping (0.0 - 1.0).
+    Non-linear mapping: 0.0->100%, 0.6->50%, >0.6->Low
+    """
+    d = np.asarray(distances, dtype=np.float32)
+
+    with np.errstate(invalid="ignore"): # Empty slots carry inf distances
+        return _calibrate(d, threshold)
+
+
+def _calibrate(d, threshold):
+    # Strong matches: linear ramp from 1.0 down to 0.5, then curved upwards
+    strong = 1.0 - d / (threshold * 2.0)
+    boost = np.power(np.clip((strong - 0.5) * 2.0, 0.0, 1.0), 0.2)
+    strong = np.minimum(1.0, strong + (1.0 - strong) * boost)
+
+    # Weak matches: linear ramp from 0.5 down to 0.0 at distance 1.0
+    weak = np.maximum(0.0, (1.0 - d) / ((1.0 - threshold) * 2.0))
+
+    return np.where(d > threshold, weak, strong).astype(np.float32)
+
+
+class MatchResult:
+    """
+    Top-k matches for a batch of query faces.
+    All arrays have shape (num_faces, k), best match first.
+    """
+    def __init__(self, indices, distances, labels, confidences):
+        self.indices = indices
+        self.distances = distances
+        self.labels = labels
+        self.confidences = confidences
+
+    def __len__(self):
+        return len(self.indices)
+
+    def best(self, i, threshold=0.6):
+        """Returns (label, confidence, distance) for query i, 'Unknown' if no match."""
+        if self.indices.shape[1] == 0 or self.indices[i, 0] < 0:
+            return "Unknown", 0.0, 1.0
+        distance = float(self.distances[i, 0])
+        confidence = float(self.confidences[i, 0])
+        label = self.labels[i][0] if distance < threshold else "Unknown"
+        return label, confidence, distance
+
+    def candidates(self, i):
+        """Returns [(label, distance, confidence), ...] for query i."""
+        return [
+            (self.labels[i][j], float(self.distances[i, j]), float(self.confidences[i, j]))
+            for j in range(self.indices.shape[1])
+            if self.indices[i, j] >= 0
+        ]
+
+
+class FaceGallery:
+    """
+    Enrolled faces kept as one contiguous float32 (N, 128) matrix.
+    All faces of a frame are scored in a single batched search against
+    a pluggable index (exact scan by default, see index.py).
+    """
+
+    DIM = 128
+
+    def __init__(self, encodings=None, labels=None, threshold=0.6, index=None):
+        self.threshold = threshold
+        self.index = index if index is not None else ExactIndex()
+        self.set(encodings if encodings is not None else [], labels or [])
+
+    def set(self, encodings, labels, key=None):
+        """
+        Replaces the gallery contents. key identifies them (e.g. EncodingStore.key)
+        so an index can reuse work saved for the same contents.
+        """
+        if len(encodings) == 0:
+            matrix = np.empty((0, self.DIM), dtype=np.float32)
+        else:
+            matrix = np.ascontiguousarray(np.asarray(encodings, dtype=np.float32).reshape(-1, self.DIM))
+
+        if len(labels) != len(matrix):
+            raise ValueError(f"Gallery has {len(matrix)} encodings but {len(labels)} labels")
+
+        self.encodings = matrix
+        self.labels = list(labels)
+        self.index.build(matrix, key=key)
+
+    def __len__(self):
+        return len(self.encodings)
+
+    def match(self, queries, k=1):
+        """
+        Scores all query encodings against the gallery in one batched pass.
+        Returns a MatchResult with the k nearest enrolled faces per query.
+        """
+        q = np.asarray(queries, dtype=np.float32).reshape(-1, self.DIM)
+        k = min(k, len(self))
+
+        if len(q) == 0 or k == 0:
+            empty = np.empty((len(q), 0))
+            return MatchResult(empty.astype(np.int64), empty.astype(np.float32), [[] for _ in q], empty)
+
+        top, top_dist = self.index.search(q, k)
+
+        labels = [[self.labels[j] if j >= 0 else "Unknown" for j in row] for row in top]
+        return MatchResult(top, top_dist, labels, calibrate_confidence(top_dist, self.threshold))
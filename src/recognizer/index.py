@@ -0,0 +1,208 @@
+import os
+import numpy as np
+
+
+def _sq_norms(matrix):
+    return np.einsum("ij,ij->i", matrix, matrix)
+
+
+def _pairwise_distances(queries, matrix, matrix_sq_norms):
+    """Euclidean distances (F, N) via |a-b|^2 = |a|^2 + |b|^2 - 2ab."""
+    sq = _sq_norms(queries)[:, None] + matrix_sq_norms[None, :] - 2.0 * (queries @ matrix.T)
+    np.maximum(sq, 0.0, out=sq) # Guard against tiny negative rounding errors
+    return np.sqrt(sq, out=sq)
+
+
+def _top_k(dist, k):
+    """Indices and distances of the k smallest columns per row, best first."""
+    if k < dist.shape[1]:
+        top = np.argpartition(dist, k - 1, axis=1)[:, :k]
+    else:
+        top = np.broadcast_to(np.arange(dist.shape[1]), dist.shape).copy()
+    top_dist = np.take_along_axis(dist, top, axis=1)
+    order = np.argsort(top_dist, axis=1)
+    return np.take_along_axis(top, order, axis=1), np.take_along_axis(top_dist, order, axis=1)
+
+
+class ExactIndex:
+    """
+    Brute-force index: one matrix product against the whole gallery.
+    Always returns the true nearest neighbours.
+    """
+    name = "exact"
+
+    def __init__(self):
+        self.matrix = np.empty((0, 0), dtype=np.float32)
+        self._sq = np.empty(0, dtype=np.float32)
+
+    def build(self, matrix, key=None):
+        self.matrix = matrix
+        self._sq = _sq_norms(matrix)
+
+    def __len__(self):
+        return len(self.matrix)
+
+    def search(self, queries, k):
+        """Returns (indices, distances), both (F, k)."""
+        return _top_k(_pairwise_distances(queries, self.matrix, self._sq), k)
+
+
+class IVFIndex:
+    """
+    Inverted-file index: k-means partitions the gallery into `nlist` cells and
+    a query only scans the `nprobe` cells closest to it.
+
+    Small galleries (< min_size) fall back to an exact scan, where partitioning
+    costs more than it saves. Setting nprobe = nlist also gives exact results.
+
+    With a cache_path, the trained cells are saved there and reused by the
+    next build() of the same gallery (same `key`, e.g. EncodingStore.key), so
+    starting or reloading does not re-run k-means unless the store changed.
+    """
+    name = "ivf"
+
+    def __init__(self, nlist=None, nprobe=16, min_size=10000, train_size=50000, iterations=15, seed=0,
+                 cache_path=None):
+        self.nlist = nlist
+        self.nprobe = nprobe
+        self.min_size = min_size
+        self.train_size = train_size
+        self.iterations = iterations
+        self.seed = seed
+        self.cache_path = cache_path
+
+        self.exact = ExactIndex()
+        self.centroids = None
+
+    def __len__(self):
+        return len(self.exact)
+
+    @property
+    def is_exact(self):
+        """True when searches use the exact fallback."""
+        return self.centroids is None
+
+    def build(self, matrix, key=None):
+        """key: identifies the gallery contents; None disables the cache."""
+        self.exact.build(matrix)
+        self.centroids = None
+
+        if len(matrix) < self.min_size:
+            return
+
+        # Rule of thumb: ~4 * sqrt(N) cells
+        nlist = self.nlist or int(4 * np.sqrt(len(matrix)))
+        nlist = max(1, min(nlist, len(matrix)))
+
+        # Training settings are part of the key: other settings, other cells
+        cache_key = None
+        if self.cache_path and key is not None:
+            cache_key = np.array([*key, nlist, self.train_size, self.iterations, self.seed], dtype=np.int64)
+            if self._load_cache(cache_key, len(matrix), nlist):
+                return
+
+        self.centroids = self._train(matrix, nlist)
+        assign = self._assign(matrix)
+
+        # Inverted lists as one permutation + offsets (no copy of the vectors)
+        self._order = np.argsort(assign, kind="stable")
+        counts = np.bincount(assign, minlength=nlist)
+        self._offsets = np.concatenate(([0], np.cumsum(counts)))
+
+        if cache_key is not None:
+            self._save_cache(cache_key)
+
+    def _load_cache(self, cache_key, rows, nlist):
+        if not os.path.exists(self.cache_path):
+            return False
+        try:
+            with np.load(self.cache_path) as data:
+                if not np.array_equal(data["key"], cache_key):
+                    return False
+                centroids, order, offsets = data["centroids"], data["order"], data["offsets"]
+        except (OSError, ValueError, KeyError) as e:
+            print(f"[WARNING] Ignoring unreadable IVF cache {self.cache_path}: {e}")
+            return False
+        if centroids.shape != (nlist, self.exact.matrix.shape[1]) or len(order) != rows or len(offsets) != nlist + 1:
+            return False
+        self.centroids, self._order, self._offsets = centroids, order, offsets
+        return True
+
+    def _save_cache(self, cache_key):
+        tmp_path = self.cache_path + ".tmp"
+        try:
+            with open(tmp_path, "wb") as f:
+                np.savez(f, key=cache_key, centroids=self.centroids, order=self._order, offsets=self._offsets)
+            os.replace(tmp_path, self.cache_path)
+        except OSError as e:
+            print(f"[WARNING] Could not save IVF cache {self.cache_path}: {e}")
+
+    def _train(self, matrix, nlist):
+        """Plain Lloyd k-means on a random sample of the gallery."""
+        rng = np.random.default_rng(self.seed)
+        sample_idx = rng.choice(len(matrix), size=min(len(matrix), self.train_size), replace=False)
+        sample = np.asarray(matrix[np.sort(sample_idx)], dtype=np.float32)
+
+        centroids = sample[rng.choice(len(sample), size=nlist, replace=False)].copy()
+        for _ in range(self.iterations):
+            assign = self._nearest_centroid(sample, centroids)
+            counts = np.bincount(assign, minlength=nlist)
+
+            # Per-cell sums via one sort + reduceat; empty cells keep their previous centroid
+            order = np.argsort(assign, kind="stable")
+            filled = counts > 0
+            starts = np.concatenate(([0], np.cumsum(counts)[:-1]))[filled]
+            sums = np.add.reduceat(sample[order], starts, axis=0)
+            centroids[filled] = sums / counts[filled, None]
+        return centroids
+
+    def _nearest_centroid(self, vectors, centroids, chunk=8192):
+        """Nearest centroid id for each vector, chunked to bound memory."""
+        c_sq = _sq_norms(centroids)
+        out = np.empty(len(vectors), dtype=np.int64)
+        for start in range(0, len(vectors), chunk):
+            block = np.asarray(vectors[start:start + chunk], dtype=np.float32)
+            # |b|^2 is constant per row, so it can be dropped for argmin
+            scores = c_sq[None, :] - 2.0 * (block @ centroids.T)
+            out[start:start + chunk] = np.argmin(scores, axis=1)
+        return out
+
+    def _assign(self, matrix):
+        return self._nearest_centroid(matrix, self.centroids)
+
+    def search(self, queries, k):
+        """Returns (indices, distances), both (F, k). Missing slots are -1 / inf."""
+        if self.is_exact:
+            return self.exact.search(queries, k)
+
+        nprobe = min(self.nprobe, len(self.centroids))
+        c_dist = _pairwise_distances(queries, self.centroids, _sq_norms(self.centroids))
+        probes = np.argpartition(c_dist, nprobe - 1, axis=1)[:, :nprobe]
+
+        indices = np.full((len(queries), k), -1, dtype=np.int64)
+        distances = np.full((len(queries), k), np.inf, dtype=np.float32)
+
+        for i, cells in enumerate(probes):
+            candidates = np.concatenate([self._order[self._offsets[c]:self._offsets[c + 1]] for c in cells])
+            if len(candidates) == 0:
+                continue
+            candidates.sort() # Sequential reads are friendlier to memory-mapped galleries
+            dist = _pairwise_distances(queries[i:i + 1], self.exact.matrix[candidates], self.exact._sq[candidates])
+            top, top_dist = _top_k(dist, min(k, len(candidates)))
+            indices[i, :top.shape[1]] = candidates[top[0]]
+            distances[i, :top.shape[1]] = top_dist[0]
+
+        return indices, distances
+
+
+INDEX_TYPES = {
+    "exact": ExactIndex,
+    "ivf": IVFIndex,
+}
+
+
+def make_index(kind="exact", **kwargs):
+    """Creates a gallery index by name ('exact' or 'ivf')."""
+    if kind not in INDEX_TYPES:
+        raise ValueError(f"Unknown index type '{kind}'. Choose from: {', '.join(INDEX_TYPES)}")
+    return INDEX_TYPES[kind](**kwargs)
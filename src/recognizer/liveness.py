@@ -0,0 +1,180 @@
+import cv2
+import numpy as np
+
+# 3D Model Points (Standard Face) for PnP Solver
+MODEL_POINTS = np.array([
+    (0.0, 0.0, 0.0),             # Nose tip
+    (0.0, -330.0, -65.0),        # Chin
+    (-225.0, 170.0, -135.0),     # Left eye left corner
+    (225.0, 170.0, -135.0),      # Right eye right corner
+    (-150.0, -150.0, -125.0),    # Left Mouth corner
+    (150.0, -150.0, -125.0)      # Right mouth corner
+], dtype="double")
+
+# Dlib indices: Nose=30, Chin=8, L_Eye=36, R_Eye=45, L_Mouth=48, R_Mouth=54
+POSE_LANDMARKS = [30, 8, 36, 45, 48, 54]
+
+# Both eyes (right eye 36-41, left eye 42-47) as one (2, 6) index block
+EYE_LANDMARKS = np.arange(36, 48).reshape(2, 6)
+
+DIST_COEFFS = np.zeros((4, 1)) # Assume no lens distortion
+
+
+def eye_aspect_ratios(landmarks):
+    """
+    Average EAR of both eyes for a batch of faces.
+    landmarks: (N, 68, 2) -> (N,) float64. Faces with a degenerate eye get 0.
+    """
+    eyes = np.asarray(landmarks, dtype=np.float64)[:, EYE_LANDMARKS]  # (N, 2, 6, 2)
+
+    # Vertical distances (p1-p5, p2-p4) and horizontal distance (p0-p3)
+    vertical = np.linalg.norm(eyes[:, :, [1, 2]] - eyes[:, :, [5, 4]], axis=-1).sum(axis=-1)
+    horizontal = np.linalg.norm(eyes[:, :, 0] - eyes[:, :, 3], axis=-1)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        ear = np.where(horizontal > 0, vertical / (2.0 * horizontal), 0.0)
+    return ear.mean(axis=1)
+
+
+def rotation_matrices(rvecs):
+    """Batched Rodrigues: (N, 3) rotation vectors -> (N, 3, 3) matrices."""
+    rvecs = np.asarray(rvecs, dtype=np.float64).reshape(-1, 3)
+    theta = np.linalg.norm(rvecs, axis=1)
+    safe = np.where(theta > 1e-12, theta, 1.0)
+    k = rvecs / safe[:, None]
+
+    # Cross-product matrices of the unit axes
+    K = np.zeros((len(k), 3, 3))
+    K[:, 0, 1], K[:, 0, 2] = -k[:, 2], k[:, 1]
+    K[:, 1, 0], K[:, 1, 2] = k[:, 2], -k[:, 0]
+    K[:, 2, 0], K[:, 2, 1] = -k[:, 1], k[:, 0]
+
+    sin, cos = np.sin(theta)[:, None, None], np.cos(theta)[:, None, None]
+    R = np.eye(3) + sin * K + (1.0 - cos) * (K @ K)
+    R[theta <= 1e-12] = np.eye(3)
+    return R
+
+
+def euler_angles(rmats):
+    """
+    (N, 3, 3) rotation matrices -> (N, 3) (pitch, yaw, roll) in degrees.
+    Same Givens-rotation decomposition (and sign conventions) as
+    cv2.decomposeProjectionMatrix / cv2.RQDecomp3x3, for a whole batch.
+    """
+    M = np.asarray(rmats, dtype=np.float64)
+    n = len(M)
+    eps = np.finfo(np.float64).eps
+
+    def givens(s, c):
+        z = 1.0 / np.sqrt(c * c + s * s + eps)
+        return s * z, c * z
+
+    # Qx zeroes M[2, 1]
+    sx, cx = givens(M[:, 2, 1], M[:, 2, 2])
+    Qx = np.zeros((n, 3, 3))
+    Qx[:, 0, 0] = 1.0
+    Qx[:, 1, 1], Qx[:, 1, 2], Qx[:, 2, 1], Qx[:, 2, 2] = cx, sx, -sx, cx
+    M1 = M @ Qx
+
+    # Qy zeroes M1[2, 0]
+    sy, cy = givens(-M1[:, 2, 0], M1[:, 2, 2])
+    Qy = np.zeros((n, 3, 3))
+    Qy[:, 1, 1] = 1.0
+    Qy[:, 0, 0], Qy[:, 0, 2], Qy[:, 2, 0], Qy[:, 2, 2] = cy, -sy, sy, cy
+    M2 = M1 @ Qy
+
+    # Qz zeroes M2[1, 0]
+    sz, cz = givens(M2[:, 1, 0], M2[:, 1, 1])
+    Qz = np.zeros((n, 3, 3))
+    Qz[:, 2, 2] = 1.0
+    Qz[:, 0, 0], Qz[:, 0, 1], Qz[:, 1, 0], Qz[:, 1, 1] = cz, sz, -sz, cz
+    R = M2 @ Qz
+
+    # Decomposition ambiguity: OpenCV rotates R by 180 degrees so that its
+    # first two diagonal entries are positive, and adjusts Qx/Qy/Qz to match
+    flip_z = (R[:, 0, 0] < 0) & (R[:, 1, 1] < 0)
+    flip_y = (R[:, 0, 0] < 0) & (R[:, 1, 1] >= 0)
+    flip_x = (R[:, 0, 0] >= 0) & (R[:, 1, 1] < 0)
+
+    x_cos, x_sin = Qx[:, 1, 1].copy(), Qx[:, 1, 2].copy()
+    y_cos, y_sin = Qy[:, 0, 0].copy(), Qy[:, 2, 0].copy()
+    z_cos, z_sin = Qz[:, 0, 0].copy(), Qz[:, 0, 1].copy()
+
+    z_cos[flip_z], z_sin[flip_z] = -z_cos[flip_z], -z_sin[flip_z]
+
+    z_sin[flip_y] = -z_sin[flip_y]                              # Qz transposed
+    y_cos[flip_y], y_sin[flip_y] = -y_cos[flip_y], -y_sin[flip_y]
+
+    z_sin[flip_x] = -z_sin[flip_x]                              # Qz, Qy transposed
+    y_sin[flip_x] = -y_sin[flip_x]
+    x_cos[flip_x], x_sin[flip_x] = -x_cos[flip_x], -x_sin[flip_x]
+
+    def angle(c, s):
+        return np.degrees(np.arccos(np.clip(c, -1.0, 1.0))) * np.where(s >= 0, 1.0, -1.0)
+
+    return np.stack([angle(x_cos, x_sin), angle(y_cos, y_sin), angle(z_cos, z_sin)], axis=1)
+
+
+class HeadPoseEstimator:
+    """
+    Head pose (pitch, yaw, roll) for all faces of a frame.
+
+    Camera intrinsics are approximated from the frame size and cached per
+    resolution. solvePnP has no batched form, so it still runs once per face,
+    but it is warm-started from that face's previous pose when one is given,
+    which usually converges in a couple of iterations. Rotation -> Euler
+    angles is done for the whole batch at once.
+    """
+
+    def __init__(self):
+        self._cameras = {}
+
+    def camera_matrix(self, img_h, img_w):
+        """Approximate intrinsics (focal length = width, centred principal point)."""
+        camera = self._cameras.get((img_h, img_w))
+        if camera is None:
+            camera = np.array([
+                [img_w, 0, img_w / 2],
+                [0, img_w, img_h / 2],
+                [0, 0, 1]
+            ], dtype="double")
+            self._cameras[(img_h, img_w)] = camera
+        return camera
+
+    def estimate(self, landmarks, img_h, img_w, previous=None):
+        """
+        landmarks: (N, 68, 2) full-frame points.
+        previous: optional list of N (rvec, tvec) pairs (or None) to warm-start from.
+        Returns (angles (N, 3) as pitch/yaw/roll degrees, list of N (rvec, tvec) or None).
+        Faces whose solve fails get zero angles and no pose.
+        """
+        landmarks = np.asarray(landmarks)
+        n = len(landmarks)
+        angles = np.zeros((n, 3))
+        if n == 0:
+            return angles, []
+
+        camera = self.camera_matrix(img_h, img_w)
+        image_points = np.ascontiguousarray(landmarks[:, POSE_LANDMARKS], dtype="double")
+        previous = previous or [None] * n
+
+        poses = [None] * n
+        for i in range(n):
+            if previous[i] is not None:
+                rvec, tvec = previous[i][0].copy(), previous[i][1].copy()
+                success, rvec, tvec = cv2.solvePnP(
+                    MODEL_POINTS, image_points[i], camera, DIST_COEFFS, rvec, tvec,
+                    useExtrinsicGuess=True, flags=cv2.SOLVEPNP_ITERATIVE
+                )
+            else:
+                success, rvec, tvec = cv2.solvePnP(
+                    MODEL_POINTS, image_points[i], camera, DIST_COEFFS, flags=cv2.SOLVEPNP_ITERATIVE
+                )
+            if success:
+                poses[i] = (rvec, tvec)
+
+        solved = [i for i in range(n) if poses[i] is not None]
+        if solved:
+            rvecs = np.stack([poses[i][0].reshape(3) for i in solved])
+            angles[solved] = euler_angles(rotation_matrices(rvecs))
+        return angles, poses
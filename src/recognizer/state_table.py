@@ -0,0 +1,72 @@
+import threading
+import time
+from collections import OrderedDict
+
+
+class BoundedStateTable:
+    """
+    Per-key state with TTL + LRU eviction, so memory stays flat no matter how
+    many distinct faces pass the camera.
+
+    Entries unused for `ttl` seconds are dropped; when the table is full the
+    least recently used entry is dropped to make room.
+    Safe to share between threads (the pipeline's identify and liveness stages).
+    """
+
+    def __init__(self, factory, max_size=256, ttl=30.0, clock=time.monotonic):
+        self.factory = factory
+        self.max_size = max_size
+        self.ttl = ttl
+        self.clock = clock
+        self.evictions = 0
+        self._entries = OrderedDict() # key -> (last_used, state), oldest first
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """Returns the state for key, creating it if needed. Marks it as recently used."""
+        now = self.clock()
+        with self._lock:
+            self._expire(now)
+
+            entry = self._entries.pop(key, None)
+            state = entry[1] if entry is not None else self.factory()
+
+            while len(self._entries) >= self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+            self._entries[key] = (now, state)
+            return state
+
+    def peek(self, key):
+        """Returns the state for key without creating or touching it."""
+        with self._lock:
+            entry = self._entries.get(key)
+        return entry[1] if entry is not None else None
+
+    def discard(self, key):
+        """Drops the state for key; the next get() starts from a fresh one."""
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def _expire(self, now):
+        # Caller holds self._lock
+        # Entries are kept in last-used order, so expired ones are at the front
+        while self._entries:
+            last_used, _ = next(iter(self._entries.values()))
+            if now - last_used <= self.ttl:
+                break
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def __len__(self):
+        with self._lock:
+            return len(self._entries)
+
+    def __contains__(self, key):
+        with self._lock:
+            return key in self._entries
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
@@ -0,0 +1,157 @@
+import itertools
+import dlib
+import numpy as np
+
+
+def iou_matrix(boxes_a, boxes_b):
+    """
+    Pairwise IoU between two lists of (top, right, bottom, left) boxes -> (A, B).
+    """
+    a = np.asarray(boxes_a, dtype=np.float32).reshape(-1, 4)
+    b = np.asarray(boxes_b, dtype=np.float32).reshape(-1, 4)
+
+    top = np.maximum(a[:, None, 0], b[None, :, 0])
+    right = np.minimum(a[:, None, 1], b[None, :, 1])
+    bottom = np.minimum(a[:, None, 2], b[None, :, 2])
+    left = np.maximum(a[:, None, 3], b[None, :, 3])
+
+    inter = np.clip(right - left, 0, None) * np.clip(bottom - top, 0, None)
+    area_a = (a[:, 1] - a[:, 3]) * (a[:, 2] - a[:, 0])
+    area_b = (b[:, 1] - b[:, 3]) * (b[:, 2] - b[:, 0])
+    union = area_a[:, None] + area_b[None, :] - inter
+    return np.where(union > 0, inter / np.maximum(union, 1e-9), 0.0)
+
+
+class Track:
+    """
+    One face followed across frames. Caches its identity so the face is only
+    re-encoded when it is new, uncertain or due for re-verification.
+    Boxes are (top, right, bottom, left) in full-frame pixels.
+    """
+    def __init__(self, track_id, box):
+        self.id = track_id
+        self.box = box
+        self.label = "Unknown"
+        self.confidence = 0.0
+        self.distance = 1.0
+        self.candidates = []
+        self.identified = False
+        self.known_label = None # Last identity other than "Unknown"
+        self.frames_since_identify = 0
+        self.missed = 0
+        self.age = 0
+        self.correlation = None # dlib.correlation_tracker, only in detect-then-track mode
+
+    def set_identity(self, label, confidence, distance, candidates):
+        """
+        Returns True when a known identity is replaced by a different known one.
+        Dropping to "Unknown" in between (head turned, borderline match) does not count.
+        """
+        changed = label != "Unknown" and self.known_label is not None and label != self.known_label
+        if label != "Unknown":
+            self.known_label = label
+        self.label = label
+        self.confidence = confidence
+        self.distance = distance
+        self.candidates = candidates
+        self.identified = True
+        self.frames_since_identify = 0
+        return changed
+
+    def is_uncertain(self, min_confidence):
+        return self.label == "Unknown" or self.confidence < min_confidence
+
+
+class FaceTracker:
+    """
+    Associates detections to tracks by IoU between full detections and, in
+    between, follows each face with a dlib correlation tracker.
+    """
+
+    def __init__(self, iou_threshold=0.3, max_missed=3, min_confidence=0.6,
+                 reidentify_interval=30, min_tracking_quality=7.0):
+        self.iou_threshold = iou_threshold
+        self.max_missed = max_missed                    # Detections a track may miss before it is dropped
+        self.min_confidence = min_confidence            # Below this the identity is re-checked every detection
+        self.reidentify_interval = reidentify_interval  # Frames between re-encoding confident tracks
+        self.min_tracking_quality = min_tracking_quality # Correlation PSR below this means the face was lost
+
+        self.tracks = []
+        self.lost = False
+        self._ids = itertools.count(1)
+
+    def update(self, boxes):
+        """
+        Matches fresh detections to existing tracks (greedy, highest IoU first).
+        Unmatched detections start new tracks; unmatched tracks age out.
+        Returns the tracks visible in this frame, in detection order.
+        """
+        matched = {}
+        if self.tracks and boxes:
+            iou = iou_matrix([t.box for t in self.tracks], boxes)
+            used_tracks = set()
+            for flat in np.argsort(-iou, axis=None):
+                ti, di = np.unravel_index(flat, iou.shape)
+                if iou[ti, di] < self.iou_threshold:
+                    break
+                if ti in used_tracks or di in matched:
+                    continue
+                used_tracks.add(ti)
+                matched[di] = self.tracks[ti]
+
+        visible = []
+        for di, box in enumerate(boxes):
+            track = matched.get(di)
+            if track is None:
+                track = Track(next(self._ids), box)
+                self.tracks.append(track)
+            track.box = box
+            track.missed = 0
+            visible.append(track)
+
+        visible_ids = {t.id for t in visible}
+        for track in self.tracks:
+            if track.id not in visible_ids:
+                track.missed += 1
+        self.tracks = [t for t in self.tracks if t.missed <= self.max_missed]
+
+        for track in visible:
+            track.age += 1
+            track.frames_since_identify += 1
+        self.lost = False
+        return visible
+
+    def needs_identity(self, track):
+        """New, uncertain or stale tracks need a fresh encoding."""
+        return (not track.identified
+                or track.is_uncertain(self.min_confidence)
+                or track.frames_since_identify >= self.reidentify_interval)
+
+    def start_correlation(self, rgb_image, scale, tracks):
+        """(Re)starts correlation trackers on the detection image (scaled by `scale`)."""
+        for track in tracks:
+            top, right, bottom, left = track.box
+            rect = dlib.rectangle(int(left * scale), int(top * scale), int(right * scale), int(bottom * scale))
+            track.correlation = dlib.correlation_tracker()
+            track.correlation.start_track(rgb_image, rect)
+
+    def predict(self, rgb_image, scale):
+        """
+        Moves visible tracks with their correlation trackers (no detection).
+        Sets self.lost when any face can no longer be followed reliably.
+        """
+        visible = []
+        for track in self.tracks:
+            if track.missed > 0 or track.correlation is None:
+                continue
+            quality = track.correlation.update(rgb_image)
+            if quality < self.min_tracking_quality:
+                self.lost = True
+                continue
+            pos = track.correlation.get_position()
+            track.box = (int(pos.top() / scale), int(pos.right() / scale),
+                         int(pos.bottom() / scale), int(pos.left() / scale))
+            track.age += 1
+            track.frames_since_identify += 1
+            visible.append(track)
+        return visible
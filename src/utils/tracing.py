@@ -0,0 +1,121 @@
+import json
+import os
+import threading
+import time
+from collections import deque
+import numpy as np
+
+
+class _NullSpan:
+    """Shared no-op context manager returned while tracing is disabled."""
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class _Span:
+    __slots__ = ("tracer", "name", "start")
+
+    def __init__(self, tracer, name):
+        self.tracer = tracer
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.tracer.record(self.name, self.start, time.perf_counter())
+        return False
+
+
+class StageTracer:
+    """
+    Optional per-stage instrumentation.
+
+    with tracer.span("detect"):
+        ...
+
+    Disabled tracers hand out one shared no-op span, so the hooks can stay in
+    hot paths. Enabled tracers keep a rolling window of durations per stage
+    (for live histograms / HUD) and a bounded event log that can be exported
+    as Chrome trace JSON (chrome://tracing, ui.perfetto.dev).
+    """
+
+    def __init__(self, enabled=False, window=200, max_events=200000):
+        self.enabled = enabled
+        self.window = window
+        self._durations = {}
+        self._events = deque(maxlen=max_events)
+        self._origin = time.perf_counter()
+        self._pid = os.getpid()
+
+    def span(self, name):
+        if not self.enabled:
+            return _NULL_SPAN
+        return _Span(self, name)
+
+    def record(self, name, start, end):
+        """Adds one measurement (perf_counter seconds)."""
+        samples = self._durations.get(name)
+        if samples is None:
+            samples = self._durations.setdefault(name, deque(maxlen=self.window))
+        samples.append(end - start)
+        self._events.append((name, start, end, threading.get_ident()))
+
+    # --- ROLLING STATS ---
+    def last_ms(self, name):
+        samples = self._durations.get(name)
+        return samples[-1] * 1000.0 if samples else 0.0
+
+    def stats(self):
+        """{stage: {avg_ms, p50_ms, p95_ms, max_ms, count}} over the rolling window."""
+        out = {}
+        for name, samples in list(self._durations.items()):
+            if not samples:
+                continue
+            ms = np.fromiter(samples, dtype=np.float64) * 1000.0
+            out[name] = {
+                "avg_ms": float(ms.mean()),
+                "p50_ms": float(np.percentile(ms, 50)),
+                "p95_ms": float(np.percentile(ms, 95)),
+                "max_ms": float(ms.max()),
+                "count": len(ms),
+            }
+        return out
+
+    def histogram(self, name, bins=10):
+        """(counts, bin_edges_ms) of the rolling window for one stage."""
+        samples = self._durations.get(name)
+        if not samples:
+            return np.zeros(bins, dtype=int), np.zeros(bins + 1)
+        return np.histogram(np.fromiter(samples, dtype=np.float64) * 1000.0, bins=bins)
+
+    # --- EXPORT ---
+    def export_chrome_trace(self, path):
+        """Writes the event log in Chrome trace format ("X" complete events, microseconds)."""
+        events = [{
+            "name": name,
+            "cat": "recognition",
+            "ph": "X",
+            "ts": (start - self._origin) * 1e6,
+            "dur": (end - start) * 1e6,
+            "pid": self._pid,
+            "tid": tid,
+        } for name, start, end, tid in list(self._events)]
+
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f)
+        return len(events)
+
+    def reset(self):
+        self._durations.clear()
+        self._events.clear()